@@ -1,13 +1,19 @@
+import hashlib
+import json
+import logging
 import os
-from datetime import datetime, timedelta
+import sys
+import time
+from datetime import date, datetime, timezone
+
+import click
 
 from dotenv import load_dotenv
-from flask import Flask, g, redirect, render_template, request, session, url_for, flash, abort, jsonify
+from flask import Flask, Response, g, redirect, render_template, request, session, url_for, flash, abort, jsonify
 from flask_wtf import CSRFProtect
 from flask_wtf.csrf import generate_csrf
 from markupsafe import Markup
 
-from app.services.supabase import init_supabase
 from app.services.auth import (
     login_with_email_password,
     verify_access_token,
@@ -22,21 +28,64 @@ from app.services.rbac import (
 )
 from app.services.users import (
     ensure_bootstrap_admin,
+    ensure_bootstrap_admin_for_login,
     get_user_profile,
+    get_user_profile_by_email,
     ensure_profile_for_auth_user,
     list_users,
+    get_team_roster,
+    profile_cache_stats,
+    roster_cache_stats,
     create_user,
     update_user,
 )
 from app.services.leads import (
-    list_leads,
+    list_leads_page,
+    list_pending_leads,
     create_lead,
     get_lead,
     update_lead,
+    bulk_update_leads,
+    search_leads,
     list_lead_images,
     upload_lead_image,
 )
-from app.services.audit import list_recent_audit_logs
+from app.services.assets import build_assets, init_assets, stale_assets
+from app.services.concurrency import fetch_concurrently
+from app.services.events import get_event_broker, lead_event_for, live_events_enabled
+from app.services.audit import (
+    flush_audit_log,
+    get_entity_as_of,
+    list_audit_history,
+    list_recent_audit_logs,
+    replay_audit_spool,
+)
+from app.services.dashboard import get_dashboard_counters, get_scope_version
+from app.services.exports import (
+    AUDIT_EXPORT_COLUMNS,
+    LEAD_EXPORT_COLUMNS,
+    iter_audit_rows,
+    iter_lead_rows,
+    stream_csv,
+    stream_xlsx,
+)
+from app.services.imports import import_leads_csv
+from app.services.metrics import (
+    end_request_trace,
+    observe_request,
+    render_prometheus,
+    request_calls,
+    server_timing_header,
+    start_request_trace,
+    summarize_calls,
+)
+from app.services.rollup import rebuild_lead_metrics
+from app.services.supabase import http_pool_stats
+from app.services.templating import (
+    configure_templates,
+    fragment_cache_stats,
+    render_fragments,
+)
 from app.services.utils import (
     generate_wa_link,
     generate_wa_prefilled_link,
@@ -49,34 +98,129 @@ from app.services.utils import (
     user_statuses,
 )
 
+request_logger = logging.getLogger("app.requests")
+
+
+def wants_json():
+    return request.headers.get("X-Requested-With") == "XMLHttpRequest" or (
+        request.accept_mimetypes.best == "application/json"
+    )
+
+
+def csrf_field():
+    return Markup(f'<input type="hidden" name="csrf_token" value="{generate_csrf()}">')
+
 
 def create_app():
     load_dotenv(override=True)
     app = Flask(__name__)
     app.secret_key = os.environ.get("FLASK_SECRET_KEY", "dev-secret")
     app.config["MAX_CONTENT_LENGTH"] = 5 * 1024 * 1024
-    app.config["TEMPLATES_AUTO_RELOAD"] = True
-    app.jinja_env.auto_reload = True
+    configure_templates(app)
+    init_assets(app)
     csrf = CSRFProtect()
     csrf.init_app(app)
 
-    init_supabase()
-    ensure_bootstrap_admin()
+    @app.cli.command("bootstrap-admin")
+    def bootstrap_admin_command():
+        ensure_bootstrap_admin()
+        click.echo("Administrador inicial verificado.")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        manifest = build_assets(app.static_folder)
+        click.echo(f"{len(manifest)} archivos estáticos generados en static/dist.")
+
+    @app.cli.command("check-assets")
+    def check_assets_command():
+        stale = stale_assets(app.static_folder)
+        if stale:
+            raise click.ClickException(
+                f"static/dist está desactualizado ({', '.join(stale)}). Ejecuta flask --app app build-assets."
+            )
+        click.echo("static/dist coincide con los archivos fuente.")
+
+    @app.cli.command("rebuild-lead-metrics")
+    def rebuild_lead_metrics_command():
+        rebuild_lead_metrics()
+        click.echo("lead_metrics_daily recalculada.")
+
+    @app.cli.command("import-leads")
+    @click.argument("csv_file", type=click.File("rb"))
+    @click.option("--actor-email", required=True, help="Correo del usuario dueño de las demos importadas.")
+    def import_leads_command(csv_file, actor_email):
+        actor = get_user_profile_by_email(actor_email)
+        if not actor:
+            raise click.ClickException(f"No existe un usuario con el correo {actor_email}.")
+        report = import_leads_csv(actor, csv_file)
+        for error in report["errors"]:
+            click.echo(f"Fila {error['row']}: {error['error']}", err=True)
+        click.echo(f"{report['inserted']} demos importadas, {len(report['errors'])} filas con errores.")
+        flush_audit_log()
+        if report["errors"]:
+            sys.exit(1)
+
+    @app.cli.command("replay-audit-spool")
+    def replay_audit_spool_command():
+        count = replay_audit_spool()
+        click.echo(f"{count} eventos de auditoría reenviados.")
 
     @app.context_processor
     def inject_csrf():
-        def csrf_input():
-            token = generate_csrf()
-            return Markup(f'<input type="hidden" name="csrf_token" value="{token}">')
-
         return {
-            "csrf_input": csrf_input,
+            "csrf_input": csrf_field,
             "status_labels": lead_status_labels(),
+            "live_events": live_events_enabled(),
         }
 
+    @app.before_request
+    def start_request_timing():
+        g.request_started = time.perf_counter()
+        g.request_trace = start_request_trace()
+
+    @app.after_request
+    def record_request_timing(response):
+        started = g.get("request_started")
+        if started is None or request.endpoint == "static":
+            return response
+        total = time.perf_counter() - started
+        calls = request_calls()
+        route = request.url_rule.rule if request.url_rule else "<sin ruta>"
+        observe_request(route, request.method, response.status_code, total)
+        server_timing = os.environ.get("SERVER_TIMING", "admin").lower()
+        is_admin = bool(g.get("user")) and g.user.get("role") == "ADMIN"
+        if server_timing == "1" or (server_timing == "admin" and is_admin):
+            response.headers["Server-Timing"] = server_timing_header(total, calls)
+        request_logger.info(
+            json.dumps(
+                {
+                    "route": route,
+                    "method": request.method,
+                    "status": response.status_code,
+                    "duration_ms": round(total * 1000, 1),
+                    "user_id": g.user.get("uid") if g.get("user") else None,
+                    "supabase_calls": len(calls),
+                    "supabase_ms": round(sum(call["duration"] for call in calls) * 1000, 1),
+                    "operations": {
+                        operation: {"count": entry["count"], "ms": round(entry["duration"] * 1000, 1)}
+                        for operation, entry in summarize_calls(calls).items()
+                    },
+                }
+            )
+        )
+        return response
+
+    @app.teardown_request
+    def end_request_timing(exc):
+        trace = g.pop("request_trace", None)
+        if trace is not None:
+            end_request_trace(trace)
+
     @app.before_request
     def load_user():
         g.user = None
+        if request.endpoint == "static":
+            return
         token = session.get("access_token")
         if not token:
             return
@@ -103,6 +247,8 @@ def create_app():
         if g.user.get("status") == "PENDIENTE" and request.method != "GET":
             if request.endpoint in {"logout"}:
                 return
+            if wants_json():
+                return jsonify(error="Cuenta pendiente de activación. No puedes realizar cambios."), 403
             flash("Cuenta pendiente de activación. No puedes realizar cambios.", "warning")
             return redirect(request.referrer or url_for("dashboard"))
 
@@ -115,6 +261,7 @@ def create_app():
             if not email or not password:
                 flash("Ingresa tu correo y contraseña.", "error")
                 return render_template("login.html")
+            ensure_bootstrap_admin_for_login(email)
             result = login_with_email_password(email, password)
             if "error" in result:
                 flash("Credenciales inválidas.", "error")
@@ -148,22 +295,13 @@ def create_app():
     @app.route("/")
     @login_required
     def dashboard():
-        leads = list_leads(g.user, status_filter=None)
         now = datetime.utcnow()
-        pendientes = []
-        for lead in leads:
-            created_at = lead.get("created_at")
-            if isinstance(created_at, str):
-                created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00")).replace(tzinfo=None)
-            if created_at and lead.get("status") == "NUEVO":
-                if created_at < now - timedelta(days=3):
-                    pendientes.append(lead)
-            if lead.get("status") == "DEMO_REALIZADA":
-                pendientes.append(lead)
+        counters = get_dashboard_counters(g.user, now=now)
+        pendientes = list_pending_leads(g.user, now=now)
         cards = {
-            "activos": len([l for l in leads if l.get("status") not in {"NO_INTERESADO"}]),
-            "demo_agendada": len([l for l in leads if l.get("status") == "DEMO_AGENDADA"]),
-            "venta_cerrada": len([l for l in leads if l.get("status") == "VENTA_CERRADA"]),
+            "activos": counters["activos"],
+            "demo_agendada": counters["demo_agendada"],
+            "venta_cerrada": counters["venta_cerrada"],
         }
         return render_template(
             "dashboard.html",
@@ -172,65 +310,51 @@ def create_app():
             status_labels=lead_status_labels(),
         )
 
+    def _scope_etag(*parts):
+        actor = (g.user.get("uid"), g.user.get("role"), g.user.get("team_id"), g.user.get("status"))
+        raw = "|".join(str(part) for part in (*actor, *parts))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _revalidated(response, etag):
+        response.set_etag(etag, weak=True)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
     @app.route("/dashboard/metrics")
     @login_required
     def dashboard_metrics():
-        leads = list_leads(g.user, status_filter=None)
         now = datetime.utcnow()
-        start_30 = now - timedelta(days=30)
-        start_7 = now - timedelta(days=6)
-
-        nuevos = 0
-        en_proceso = 0
-        vendidos = 0
-
-        activity_counts = { (start_7 + timedelta(days=i)).date(): 0 for i in range(7) }
-        demos_total = 0
-        ventas_total = 0
-
-        no_contact_count = 0
-        total_leads = len(leads)
-
-        for lead in leads:
-            status = lead.get("status")
-            created_at = _parse_dt(lead.get("created_at"))
-            updated_at = _parse_dt(lead.get("updated_at"))
-
-            if created_at and created_at < start_30:
-                within_30 = False
-            else:
-                within_30 = True
-
-            if within_30:
-                if status == "NUEVO":
-                    nuevos += 1
-                elif status in {"CONTACTADO", "DEMO_AGENDADA", "DEMO_REALIZADA"}:
-                    en_proceso += 1
-                elif status == "VENTA_CERRADA":
-                    vendidos += 1
-
-            if updated_at and updated_at.date() in activity_counts and status == "DEMO_REALIZADA":
-                activity_counts[updated_at.date()] += 1
-
-            if updated_at and updated_at >= start_30 and status in {"DEMO_REALIZADA", "VENTA_CERRADA"}:
-                demos_total += 1
-                if status == "VENTA_CERRADA":
-                    ventas_total += 1
-
-            if status == "NUEVO" and created_at and created_at <= now - timedelta(hours=48):
-                no_contact_count += 1
+        if request.if_none_match:
+            version = get_scope_version(g.user)
+            counters = None
+        else:
+            results = fetch_concurrently(
+                version=lambda: get_scope_version(g.user),
+                counters=lambda: get_dashboard_counters(g.user, now=now),
+            )
+            version, counters = results["version"], results["counters"]
+        etag = _scope_etag("metrics", *version, now.strftime("%Y-%m-%dT%H")) if version else None
+        if etag and request.if_none_match.contains_weak(etag):
+            return _revalidated(Response(status=304), etag)
+        if counters is None:
+            counters = get_dashboard_counters(g.user, now=now)
+        demos_total = counters["demos_total"]
+        ventas_total = counters["ventas_total"]
+        no_contact_count = counters["no_contact_count"]
+        total_leads = counters["total_leads"]
 
         demos_pct = int((ventas_total / demos_total) * 100) if demos_total else 0
         no_contact_pct = int((no_contact_count / total_leads) * 100) if total_leads else 0
 
-        activity_labels = [d.strftime("%d/%m") for d in activity_counts.keys()]
-        activity_values = list(activity_counts.values())
+        activity = counters["activity_7d"]
+        activity_labels = [date.fromisoformat(item["day"]).strftime("%d/%m") for item in activity]
+        activity_values = [item["count"] for item in activity]
 
-        return jsonify(
+        response = jsonify(
             lead_status_summary={
-                "nuevos": nuevos,
-                "en_proceso": en_proceso,
-                "vendidos": vendidos,
+                "nuevos": counters["nuevos"],
+                "en_proceso": counters["en_proceso"],
+                "vendidos": counters["vendidos"],
             },
             activity_7d={
                 "labels": activity_labels,
@@ -248,6 +372,41 @@ def create_app():
                 "no_contact_pct": no_contact_pct,
             },
         )
+        return _revalidated(response, etag) if etag else response
+
+    @app.route("/metrics")
+    @login_required
+    @role_required(["ADMIN"])
+    def metrics():
+        pools = http_pool_stats()
+        caches = {
+            "profiles": profile_cache_stats(),
+            "rosters": roster_cache_stats(),
+            "row_fragments": fragment_cache_stats(),
+        }
+        gauges = [
+            (
+                "hyla_supabase_http_connections",
+                "Conexiones abiertas por sesión HTTP de Supabase.",
+                [({"session": name}, stats["connections"]) for name, stats in pools.items()],
+            ),
+            (
+                "hyla_supabase_http_requests",
+                "Requests enviados por sesión HTTP de Supabase desde el arranque.",
+                [({"session": name}, stats["requests"]) for name, stats in pools.items()],
+            ),
+            (
+                "hyla_cache_hits",
+                "Aciertos de caché en memoria desde el arranque.",
+                [({"cache": name}, stats["hits"]) for name, stats in caches.items()],
+            ),
+            (
+                "hyla_cache_misses",
+                "Fallos de caché en memoria desde el arranque.",
+                [({"cache": name}, stats["misses"]) for name, stats in caches.items()],
+            ),
+        ]
+        return Response(render_prometheus(gauges), mimetype="text/plain; version=0.0.4")
 
     @app.route("/admin/usuarios", methods=["GET", "POST"])
     @login_required
@@ -284,8 +443,9 @@ def create_app():
             except Exception:
                 flash("No se pudo crear el usuario.", "error")
             return redirect(url_for("admin_users"))
-        users = list_users(actor=g.user)
-        managers = [u for u in users if _role_name(u) == "JEFE"]
+        roster = get_team_roster(g.user)
+        users = roster["users"]
+        managers = roster["managers"]
         return render_template(
             "admin_users.html",
             users=users,
@@ -306,6 +466,7 @@ def create_app():
             update_user(
                 actor=g.user,
                 uid=uid,
+                before=user,
                 updates={
                     "name": form.get("name", "").strip(),
                     "city": form.get("city", "").strip(),
@@ -317,7 +478,7 @@ def create_app():
             )
             flash("Usuario actualizado.", "success")
             return redirect(url_for("admin_users"))
-        managers = [u for u in list_users(actor=g.user) if _role_name(u) == "JEFE"]
+        managers = get_team_roster(g.user)["managers"]
         return render_template(
             "user_edit.html",
             user=user,
@@ -384,7 +545,7 @@ def create_app():
                 "city": form.get("city", "").strip(),
                 "status": form.get("status"),
             }
-            update_user(actor=g.user, uid=uid, updates=updates)
+            update_user(actor=g.user, uid=uid, updates=updates, before=user)
             flash("Usuario actualizado.", "success")
             return redirect(url_for("jefe_users"))
         return render_template(
@@ -399,24 +560,75 @@ def create_app():
     @login_required
     def leads_list():
         status = request.args.get("status")
-        leads = list_leads(g.user, status_filter=status)
-        users = []
-        demo_users = []
+        page_size = request.args.get("page_size", type=int) or 50
+        page_size = max(1, min(page_size, 200))
+        search = request.args.get("q")
+        reads = {
+            "page": lambda: list_leads_page(
+                g.user,
+                status_filter=status,
+                after=request.args.get("after"),
+                before=request.args.get("before"),
+                page_size=page_size,
+                search=search,
+            )
+        }
         if g.user.get("role") in {"ADMIN", "JEFE"}:
-            users = list_users(actor=g.user)
-            demo_users = [u for u in users if _role_name(u) in demo_assignable_roles()]
-        user_map = {u.get("uid"): u.get("name") for u in users}
+            reads["roster"] = lambda: get_team_roster(g.user)
+        results = fetch_concurrently(**reads)
+        page = results["page"]
+        roster = results.get("roster")
+        etag = _scope_etag(
+            "leads",
+            request.full_path,
+            *((lead.get("id"), lead.get("updated_at")) for lead in page["leads"]),
+            page["next_cursor"],
+            page["prev_cursor"],
+            roster["version"] if roster else "",
+            int(time.time() // 1800),
+        )
+        has_flashes = "_flashes" in session
+        if not has_flashes and request.if_none_match.contains_weak(etag):
+            return _revalidated(Response(status=304), etag)
+        user_map = {}
+        demo_users = []
+        if roster:
+            user_map = roster["names"]
+            demo_users = roster["demo_assignable"]
         if not user_map:
             user_map = {g.user.get("uid"): g.user.get("name")}
-        return render_template(
-            "leads_list.html",
-            leads=leads,
+        can_assign_demo = g.user.get("role") in {"ADMIN", "JEFE"}
+        row_version = roster["version"] if roster else f'{g.user.get("uid")}:{g.user.get("name")}'
+        lead_rows = render_fragments(
+            "_lead_row.html",
+            page["leads"],
+            "lead",
+            key=lambda lead: (lead.get("id"), lead.get("updated_at"), row_version, can_assign_demo),
+            csrf_field=csrf_field(),
             statuses=lead_statuses(),
+            status_labels=lead_status_labels(),
             user_map=user_map,
             demo_users=demo_users,
-            can_assign_demo=g.user.get("role") in {"ADMIN", "JEFE"},
-            status_labels=lead_status_labels(),
+            can_assign_demo=can_assign_demo,
         )
+        response = app.make_response(
+            render_template(
+                "leads_list.html",
+                leads=page["leads"],
+                lead_rows=lead_rows,
+                next_cursor=page["next_cursor"],
+                prev_cursor=page["prev_cursor"],
+                page_size=page_size,
+                statuses=lead_statuses(),
+                user_map=user_map,
+                demo_users=demo_users,
+                can_assign_demo=can_assign_demo,
+                status_labels=lead_status_labels(),
+            )
+        )
+        if has_flashes:
+            return response
+        return _revalidated(response, etag)
 
     @app.route("/leads/nuevo", methods=["GET", "POST"])
     @login_required
@@ -461,6 +673,139 @@ def create_app():
             status_labels=lead_status_labels(),
         )
 
+    @app.route("/leads/export")
+    @login_required
+    def leads_export():
+        rows = iter_lead_rows(
+            dict(g.user),
+            status_filter=request.args.get("status") or None,
+            search=request.args.get("q") or None,
+        )
+        return _export_response("demos", LEAD_EXPORT_COLUMNS, rows)
+
+    @app.route("/audit/export")
+    @login_required
+    @role_required(["ADMIN", "JEFE"])
+    def audit_export():
+        return _export_response("auditoria", AUDIT_EXPORT_COLUMNS, iter_audit_rows(dict(g.user)))
+
+    def _export_response(name, header, rows):
+        stamp = datetime.utcnow().strftime("%Y%m%d-%H%M")
+        if request.args.get("format") == "xlsx":
+            body = stream_xlsx(header, rows)
+            mimetype = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            filename = f"{name}-{stamp}.xlsx"
+        else:
+            body = stream_csv(header, rows)
+            mimetype = "text/csv"
+            filename = f"{name}-{stamp}.csv"
+        return Response(
+            body,
+            mimetype=mimetype,
+            headers={
+                "Content-Disposition": f'attachment; filename="{filename}"',
+                "Cache-Control": "no-store",
+                "X-Accel-Buffering": "no",
+            },
+        )
+
+    @app.route("/leads/eventos")
+    @login_required
+    def lead_events():
+        if not live_events_enabled():
+            abort(404)
+        actor = dict(g.user)
+        labels = lead_status_labels()
+        max_seconds = int(os.environ.get("SSE_MAX_SECONDS", "300"))
+
+        def stream():
+            subscription = get_event_broker().subscribe()
+            try:
+                yield "retry: 3000\n\n"
+                deadline = time.monotonic() + max_seconds
+                while time.monotonic() < deadline:
+                    event = subscription.get(timeout=15)
+                    if event is None:
+                        yield ": ping\n\n"
+                        continue
+                    payload = lead_event_for(actor, event)
+                    if payload:
+                        status = payload["lead"].get("status")
+                        payload["lead"]["status_label"] = labels.get(status, status)
+                        yield f"event: lead\ndata: {json.dumps(payload, default=str)}\n\n"
+            finally:
+                subscription.close()
+
+        return Response(
+            stream(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    @app.route("/leads/buscar")
+    @login_required
+    def leads_search():
+        results = search_leads(g.user, request.args.get("q", ""))
+        return jsonify(
+            results=[
+                {
+                    "id": lead.get("id"),
+                    "name": f"{lead.get('first_name') or ''} {lead.get('last_name') or ''}".strip(),
+                    "whatsapp_number": lead.get("whatsapp_number"),
+                    "city": lead.get("city"),
+                    "status": lead.get("status"),
+                    "url": url_for("lead_detail", id=lead.get("id")),
+                }
+                for lead in results
+            ]
+        )
+
+    @app.route("/leads/acciones", methods=["POST"])
+    @login_required
+    def leads_bulk_action():
+        lead_ids = request.form.getlist("lead_ids")[:500]
+        back = request.referrer or url_for("leads_list")
+        if not lead_ids:
+            flash("Selecciona al menos una demo.", "error")
+            return redirect(back)
+        action = request.form.get("action")
+        if action == "status":
+            status = request.form.get("bulk_status")
+            if status not in lead_statuses():
+                flash("Estado inválido.", "error")
+                return redirect(back)
+            updates = {"status": status}
+        elif action == "demo" and g.user.get("role") in {"ADMIN", "JEFE"}:
+            demo_user_id = request.form.get("bulk_demo_user_id") or None
+            if demo_user_id and demo_user_id not in {u.get("uid") for u in _get_demo_users()}:
+                flash("Usuario inválido.", "error")
+                return redirect(back)
+            updates = {"demo_user_id": demo_user_id}
+        else:
+            abort(400)
+        updated = bulk_update_leads(actor=g.user, lead_ids=lead_ids, updates=updates)
+        flash(f"{len(updated)} demos actualizadas.", "success")
+        return redirect(back)
+
+    @app.route("/leads/importar", methods=["GET", "POST"])
+    @login_required
+    def lead_import():
+        report = None
+        if request.method == "POST":
+            file = request.files.get("csv_file")
+            if not file or not file.filename:
+                flash("Selecciona un archivo CSV.", "error")
+                return redirect(url_for("lead_import"))
+            if not file.filename.lower().endswith(".csv"):
+                flash("El archivo debe ser CSV.", "error")
+                return redirect(url_for("lead_import"))
+            report = import_leads_csv(g.user, file.stream)
+            if report["inserted"]:
+                flash(f"{report['inserted']} demos importadas.", "success")
+            if report["errors"]:
+                flash(f"{len(report['errors'])} filas no se importaron.", "warning")
+        return render_template("lead_import.html", report=report)
+
     @app.route("/leads/<id>")
     @login_required
     def lead_detail(id):
@@ -480,9 +825,14 @@ def create_app():
             lead.get("region"),
             lead.get("country"),
         )
-        images = list_lead_images(id)
-        logs = list_recent_audit_logs(entity_type="lead", entity_id=id)
-        demo_users = _get_demo_users()
+        results = fetch_concurrently(
+            images=lambda: list_lead_images(id),
+            logs=lambda: list_recent_audit_logs(entity_type="lead", entity_id=id),
+            demo_users=_get_demo_users,
+        )
+        images = results["images"]
+        logs = results["logs"]
+        demo_users = results["demo_users"]
         demo_user_map = {u.get("uid"): u.get("name") for u in demo_users}
         if not demo_user_map:
             demo_user_map = {g.user.get("uid"): g.user.get("name")}
@@ -498,16 +848,54 @@ def create_app():
             status_labels=lead_status_labels(),
         )
 
+    @app.route("/leads/<id>/historial")
+    @login_required
+    def lead_history(id):
+        lead = get_lead(id)
+        if not lead or not can_access_lead(g.user, lead):
+            abort(403)
+        as_of = request.args.get("as_of")
+        if as_of:
+            try:
+                moment = datetime.fromisoformat(as_of)
+            except ValueError:
+                return jsonify(error="Fecha inválida. Usa el formato ISO, por ejemplo 2024-05-01T12:00:00."), 400
+            if moment.tzinfo:
+                moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+            as_of = moment.isoformat()
+            return jsonify(as_of=as_of, lead=get_entity_as_of("lead", id, as_of))
+        limit = min(max(request.args.get("limit", 20, type=int) or 20, 1), 100)
+        return jsonify(
+            history=[
+                {
+                    "timestamp": entry.get("timestamp"),
+                    "actor_name": entry.get("actor_name"),
+                    "action": entry.get("action"),
+                    "changes": {
+                        field: [entry["state_before"].get(field), value]
+                        for field, value in entry["state_after"].items()
+                        if entry["state_before"].get(field) != value
+                    },
+                    "lead": entry["state_after"],
+                }
+                for entry in list_audit_history("lead", id, limit=limit)
+            ]
+        )
+
     @app.route("/leads/<id>/editar", methods=["GET", "POST"])
     @login_required
     def lead_edit(id):
-        lead = get_lead(id)
+        results = fetch_concurrently(
+            lead=lambda: get_lead(id),
+            demo_users=_get_demo_users,
+        )
+        lead = results["lead"]
         if not lead or not can_access_lead(g.user, lead):
             abort(403)
         possible_owners = []
         if g.user.get("role") in {"ADMIN", "JEFE"}:
             possible_owners = list_users(actor=g.user)
-        demo_users = _get_demo_users()
+        demo_users = results["demo_users"]
         if request.method == "POST":
             form = request.form
             whatsapp = form.get("whatsapp_number", "").strip()
@@ -541,7 +929,19 @@ def create_app():
             demo_ids = {u.get("uid") for u in demo_users}
             if demo_user_id and demo_user_id in demo_ids:
                 updates["demo_user_id"] = demo_user_id
-            update_lead(actor=g.user, lead_id=id, updates=updates)
+            try:
+                update_lead(
+                    actor=g.user,
+                    lead_id=id,
+                    updates=updates,
+                    before=lead,
+                    expected_updated_at=form.get("updated_at") or None,
+                )
+            except ValueError as exc:
+                if str(exc) == "stale_lead":
+                    flash("Otra persona modificó esta demo. Revisa los datos actuales y vuelve a guardar.", "error")
+                    return redirect(url_for("lead_edit", id=id))
+                raise
             flash("Demo actualizada.", "success")
             return redirect(url_for("lead_detail", id=id))
         return render_template(
@@ -575,51 +975,63 @@ def create_app():
     def lead_quick_status(id):
         lead = get_lead(id)
         if not lead or not can_access_lead(g.user, lead):
-            abort(403)
+            return _inline_error("No tienes acceso a esta demo.", 403)
         status = request.form.get("status")
         if status not in lead_statuses():
-            flash("Estado inválido.", "error")
-            return redirect(url_for("leads_list"))
-        update_lead(actor=g.user, lead_id=id, updates={"status": status})
-        flash("Estado actualizado.", "success")
+            return _inline_error("Estado inválido.", 400)
+        updated = update_lead(actor=g.user, lead_id=id, updates={"status": status}, before=lead)
+        return _inline_success("Estado actualizado.", updated)
+
+    def _inline_error(message, status_code):
+        if wants_json():
+            return jsonify(error=message), status_code
+        if status_code == 403:
+            abort(403)
+        flash(message, "error")
         return redirect(url_for("leads_list"))
 
+    def _inline_success(message, lead):
+        if not wants_json():
+            flash(message, "success")
+            return redirect(url_for("leads_list"))
+        demo_user_id = lead.get("demo_user_id")
+        demo_user_name = None
+        if demo_user_id:
+            demo_user_name = {u.get("uid"): u.get("name") for u in _get_demo_users()}.get(demo_user_id)
+        return jsonify(
+            message=message,
+            lead={
+                "id": lead.get("id"),
+                "status": lead.get("status"),
+                "status_label": lead_status_labels().get(lead.get("status"), lead.get("status")),
+                "demo_user_id": demo_user_id,
+                "demo_user_name": demo_user_name,
+                "updated_at": lead.get("updated_at"),
+            },
+        )
+
     def _get_demo_users():
         if g.user.get("role") in {"ADMIN", "JEFE"}:
-            users = list_users(actor=g.user)
-            return [u for u in users if _role_name(u) in demo_assignable_roles()]
+            return get_team_roster(g.user)["demo_assignable"]
         return []
 
-    def _role_name(user):
-        return (user.get("role") or "").strip().upper()
-
-    def _parse_dt(value):
-        if isinstance(value, datetime):
-            return value
-        if isinstance(value, str) and value:
-            try:
-                return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
-            except ValueError:
-                return None
-        return None
-
     @app.route("/leads/<id>/demo-asignada", methods=["POST"])
     @login_required
     def lead_quick_demo_assign(id):
         lead = get_lead(id)
         if not lead or not can_access_lead(g.user, lead):
-            abort(403)
+            return _inline_error("No tienes acceso a esta demo.", 403)
         demo_users = _get_demo_users()
         demo_ids = {u.get("uid") for u in demo_users}
         demo_user_id = request.form.get("demo_user_id")
         if demo_user_id and demo_user_id not in demo_ids:
-            flash("Usuario inválido.", "error")
-            return redirect(url_for("leads_list"))
-        update_lead(actor=g.user, lead_id=id, updates={"demo_user_id": demo_user_id or None})
-        flash("Demo asignada actualizada.", "success")
-        return redirect(url_for("leads_list"))
+            return _inline_error("Usuario inválido.", 400)
+        updated = update_lead(
+            actor=g.user,
+            lead_id=id,
+            updates={"demo_user_id": demo_user_id or None},
+            before=lead,
+        )
+        return _inline_success("Demo asignada actualizada.", updated)
 
     return app
-
-
-app = create_app()
@@ -0,0 +1,227 @@
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+
+from flask import request, send_from_directory
+
+from app.services.templating import is_production
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+SOURCES_NAME = "sources.json"
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".txt", ".map"}
+IMAGE_VARIANTS = {".png": ("webp", "avif"), ".jpg": ("webp", "avif"), ".jpeg": ("webp", "avif")}
+IMAGE_VARIANT_MIN_BYTES = 100 * 1024
+
+_CSS_URL = re.compile(r'url\(\s*["\']?/static/([^"\')]+)["\']?\s*\)')
+_CSS_BACKGROUND = re.compile(r"^(?P<indent>\s*)background(?:-image)?:(?P<value>[^;]*);", re.MULTILINE)
+
+
+def build_assets(static_folder):
+    """Write content-hashed copies of the static files to `static/dist`.
+
+    Large PNG/JPEG images also get WebP (and AVIF, when Pillow supports it)
+    variants; CSS `url(/static/...)` references are rewritten to hashed names
+    and get an `image-set()` with the variants. Text assets are precompressed
+    with gzip and, when the `brotli` package is installed, brotli.
+    """
+    output = os.path.join(static_folder, DIST_DIR)
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    os.makedirs(output)
+
+    sources = sorted(_iter_sources(static_folder))
+    manifest = {}
+    variants = {}
+    for name in sources:
+        if name.endswith(".css"):
+            continue
+        with open(os.path.join(static_folder, name), "rb") as handle:
+            content = handle.read()
+        manifest[name] = _write_hashed(output, name, content)
+        extension = os.path.splitext(name)[1].lower()
+        if extension in IMAGE_VARIANTS and len(content) >= IMAGE_VARIANT_MIN_BYTES:
+            for image_format in IMAGE_VARIANTS[extension]:
+                encoded = _encode_image(content, image_format)
+                if encoded:
+                    variant_name = f"{os.path.splitext(name)[0]}.{image_format}"
+                    manifest[variant_name] = _write_hashed(output, variant_name, encoded)
+                    variants.setdefault(name, []).append((image_format, variant_name))
+    for name in sources:
+        if not name.endswith(".css"):
+            continue
+        with open(os.path.join(static_folder, name), encoding="utf-8") as handle:
+            css = rewrite_css(handle.read(), manifest, variants)
+        manifest[name] = _write_hashed(output, name, css.encode("utf-8"))
+
+    with open(os.path.join(output, MANIFEST_NAME), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2, sort_keys=True)
+    with open(os.path.join(output, SOURCES_NAME), "w", encoding="utf-8") as handle:
+        json.dump(_source_digests(static_folder), handle, indent=2, sort_keys=True)
+    return manifest
+
+
+def stale_assets(static_folder):
+    """Source files that changed, appeared or disappeared since the last `build_assets`."""
+    path = os.path.join(static_folder, DIST_DIR, SOURCES_NAME)
+    if not os.path.exists(path):
+        return sorted(_source_digests(static_folder))
+    with open(path, encoding="utf-8") as handle:
+        built = json.load(handle)
+    current = _source_digests(static_folder)
+    return sorted(name for name in set(built) | set(current) if built.get(name) != current.get(name))
+
+
+def rewrite_css(css, manifest, variants):
+    def add_image_set(match):
+        declaration = match.group(0)
+        urls = _CSS_URL.findall(match.group("value"))
+        if len(urls) != 1 or urls[0] not in variants:
+            return declaration
+        name = urls[0]
+        candidates = [
+            f'url("/static/{variant}") type("image/{image_format}")'
+            for image_format, variant in sorted(variants[name], key=lambda item: item[0] != "avif")
+        ]
+        candidates.append(f'url("/static/{name}") type("{mimetypes.guess_type(name)[0]}")')
+        return f"{declaration}\n{match.group('indent')}background-image: image-set({', '.join(candidates)});"
+
+    css = _CSS_BACKGROUND.sub(add_image_set, css)
+
+    def hashed(match):
+        name = match.group(1)
+        if name not in manifest:
+            return match.group(0)
+        return f'url("/static/{DIST_DIR}/{manifest[name]}")'
+
+    return _CSS_URL.sub(hashed, css)
+
+
+def init_assets(app):
+    manifest_path = os.path.join(app.static_folder, DIST_DIR, MANIFEST_NAME)
+    default = "1" if is_production() else "0"
+    if os.environ.get("STATIC_FINGERPRINT", default) != "1" or not os.path.exists(manifest_path):
+        return
+    stale = stale_assets(app.static_folder)
+    if stale:
+        logger.error(
+            "static/dist no coincide con los archivos fuente (%s); se sirven sin huella. "
+            "Ejecuta flask --app app build-assets",
+            ", ".join(stale),
+        )
+        return
+    with open(manifest_path, encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    default_static = app.view_functions["static"]
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = f"{DIST_DIR}/{manifest[values['filename']]}"
+
+    def static(filename):
+        if not filename.startswith(f"{DIST_DIR}/"):
+            return default_static(filename=filename)
+        return send_hashed_asset(app.static_folder, filename)
+
+    app.view_functions["static"] = static
+
+
+def send_hashed_asset(static_folder, filename):
+    accepted = request.accept_encodings
+    encoding = None
+    served = filename
+    for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if accepted[candidate] and os.path.isfile(os.path.join(static_folder, filename + suffix)):
+            encoding = candidate
+            served = filename + suffix
+            break
+    response = send_from_directory(
+        static_folder,
+        served,
+        mimetype=mimetypes.guess_type(filename)[0],
+        max_age=IMMUTABLE_MAX_AGE,
+        conditional=True,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.content_encoding = encoding
+    return response
+
+
+def _iter_sources(static_folder):
+    for root, directories, files in os.walk(static_folder):
+        relative_root = os.path.relpath(root, static_folder)
+        if relative_root == DIST_DIR or relative_root.startswith(f"{DIST_DIR}{os.sep}"):
+            directories[:] = []
+            continue
+        for name in files:
+            if name.startswith("."):
+                continue
+            path = os.path.normpath(os.path.join(relative_root, name))
+            yield path.replace(os.sep, "/")
+
+
+def _source_digests(static_folder):
+    digests = {}
+    for name in _iter_sources(static_folder):
+        with open(os.path.join(static_folder, name), "rb") as handle:
+            digests[name] = hashlib.sha256(handle.read()).hexdigest()
+    return digests
+
+
+def _write_hashed(output, name, content):
+    digest = hashlib.sha256(content).hexdigest()[:10]
+    stem, extension = os.path.splitext(name)
+    hashed_name = f"{stem}.{digest}{extension}"
+    path = os.path.join(output, hashed_name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(content)
+    if extension.lower() in COMPRESSIBLE_EXTENSIONS:
+        with open(path + ".gz", "wb") as handle:
+            handle.write(gzip.compress(content, compresslevel=9, mtime=0))
+        compressed = _brotli(content)
+        if compressed:
+            with open(path + ".br", "wb") as handle:
+                handle.write(compressed)
+    return hashed_name
+
+
+def _brotli(content):
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(content, quality=11)
+
+
+def _encode_image(content, image_format):
+    from PIL import Image, features
+
+    if image_format == "avif":
+        try:
+            import pillow_avif  # noqa: F401
+        except ImportError:
+            pass
+    Image.init()
+    if image_format.upper() not in Image.SAVE or (image_format == "webp" and not features.check("webp")):
+        return None
+    with Image.open(io.BytesIO(content)) as image:
+        image.load()
+        buffer = io.BytesIO()
+        quality = 60 if image_format == "avif" else 80
+        image.save(buffer, format=image_format.upper(), quality=quality)
+    return buffer.getvalue()
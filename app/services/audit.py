@@ -1,6 +1,130 @@
+import atexit
+import json
+import logging
+import os
+import random
+import threading
 from datetime import datetime
 
+from app.services.cache import TTLCache
 from app.services.supabase import get_admin_client
+from app.services.utils import background_mode, decode_cursor, encode_cursor
+
+logger = logging.getLogger(__name__)
+
+# Fields kept in every diff so the rollups can attribute each change to the
+# owner and team it had at the time.
+AUDIT_CONTEXT_FIELDS = {"lead": ("owner_user_id", "team_id")}
+
+_writer = None
+_writer_lock = threading.Lock()
+_snapshot_counts = None
+_snapshot_lock = threading.Lock()
+
+
+class AuditWriter:
+    def __init__(self, batch_size=50, flush_interval=1.0, spool_path=None, sync=False):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.sync = sync
+        self._queue = []
+        self._inflight = []
+        self._closed = False
+        self._thread = None
+        self._cond = threading.Condition()
+        self._spool_lock = threading.Lock()
+
+    def submit(self, event):
+        if self.sync:
+            self._write([event])
+            return
+        with self._cond:
+            self._queue.append(event)
+            self._ensure_thread()
+            if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+                self._cond.notify()
+
+    def submit_many(self, events):
+        if not events:
+            return
+        if self.sync:
+            self._write(events, chunk_size=len(events))
+            return
+        with self._cond:
+            self._queue.extend(events)
+            self._ensure_thread()
+            self._cond.notify()
+
+    def pending(self, entity_type, entity_id):
+        with self._cond:
+            events = self._inflight + self._queue
+            return [
+                dict(event)
+                for event in events
+                if event.get("entity_type") == entity_type and event.get("entity_id") == str(entity_id)
+            ]
+
+    def flush(self):
+        with self._cond:
+            batch, self._queue = self._queue, []
+        self._write(batch)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        thread = self._thread
+        if thread and thread.is_alive():
+            thread.join(timeout=10)
+        self.flush()
+
+    def _ensure_thread(self):
+        if self._closed or (self._thread and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if len(self._queue) < self.batch_size and not self._closed:
+                    self._cond.wait(self.flush_interval)
+                batch, self._queue = self._queue, []
+                closed = self._closed
+            self._write(batch)
+            if closed:
+                return
+
+    def _write(self, events, chunk_size=None):
+        if not events:
+            return
+        chunk_size = chunk_size or self.batch_size
+        with self._cond:
+            self._inflight = self._inflight + events
+        try:
+            admin = get_admin_client()
+            for start in range(0, len(events), chunk_size):
+                chunk = events[start : start + chunk_size]
+                try:
+                    admin.table("audit_logs").insert(chunk).execute()
+                except Exception:
+                    logger.exception("No se pudo guardar audit_logs; se guarda en %s", self.spool_path)
+                    self._spool(chunk)
+        finally:
+            written = {id(event) for event in events}
+            with self._cond:
+                self._inflight = [event for event in self._inflight if id(event) not in written]
+
+    def _spool(self, events):
+        if not self.spool_path:
+            return
+        with self._spool_lock:
+            with open(self.spool_path, "a", encoding="utf-8") as handle:
+                for event in events:
+                    handle.write(json.dumps(event, default=str) + "\n")
 
 
 def log_event(
@@ -12,8 +136,35 @@ def log_event(
     before=None,
     after=None,
 ):
-    admin = get_admin_client()
-    data = {
+    get_audit_writer().submit(_build_event(actor, action, entity_type, entity_id, team_id, before, after))
+
+
+def log_events(actor, action, entity_type, entries):
+    events = [
+        _build_event(
+            actor,
+            action,
+            entity_type,
+            entry["entity_id"],
+            entry.get("team_id"),
+            entry.get("before"),
+            entry.get("after"),
+        )
+        for entry in entries
+    ]
+    get_audit_writer().submit_many(events)
+
+
+def _build_event(actor, action, entity_type, entity_id, team_id, before, after):
+    before = before or {}
+    after = after or {}
+    snapshot = None
+    if before and after:
+        snapshot = after if _take_snapshot(entity_type, entity_id) else None
+        before, after = audit_diff(before, after, keep=AUDIT_CONTEXT_FIELDS.get(entity_type, ()))
+    elif after:
+        _reset_snapshot_count(entity_type, entity_id)
+    return {
         "timestamp": datetime.utcnow().isoformat(),
         "actor_user_id": actor.get("uid"),
         "actor_name": actor.get("name"),
@@ -21,10 +172,35 @@ def log_event(
         "entity_type": entity_type,
         "entity_id": str(entity_id),
         "team_id": team_id,
-        "before": before or {},
-        "after": after or {},
+        "before": before,
+        "after": after,
+        "snapshot": snapshot,
     }
-    admin.table("audit_logs").insert(data).execute()
+
+
+def audit_diff(before, after, keep=()):
+    """Return the previous and new values of the fields of `after` that changed, plus `keep`."""
+    changed = [field for field in after if field in keep or before.get(field) != after.get(field)]
+    return {field: before.get(field) for field in changed}, {field: after.get(field) for field in changed}
+
+
+def rebuild_audit_states(entries, base=None):
+    """Fill `state_before`/`state_after` of `entries` (oldest first) by replaying their patches.
+
+    Entries with a `snapshot` restart the replay from it (their previous state
+    is the snapshot with `before` applied); rows written before diff storage
+    hold the full row in `after` and replay the same way.
+    """
+    state = dict(base or {})
+    for entry in entries:
+        if entry.get("snapshot"):
+            entry["state_before"] = {**entry["snapshot"], **(entry.get("before") or {})}
+            state = dict(entry["snapshot"])
+        else:
+            entry["state_before"] = dict(state)
+            state.update(entry.get("after") or {})
+        entry["state_after"] = dict(state)
+    return entries
 
 
 def list_recent_audit_logs(entity_type, entity_id, limit=20):
@@ -38,4 +214,134 @@ def list_recent_audit_logs(entity_type, entity_id, limit=20):
         .limit(limit)
         .execute()
     )
-    return [dict(row) for row in result.data]
+    pending = get_audit_writer().pending(entity_type, entity_id)
+    pending.sort(key=lambda row: row.get("timestamp") or "", reverse=True)
+    return (pending + [dict(row) for row in result.data])[:limit]
+
+
+def list_audit_history(entity_type, entity_id, limit=20):
+    """Most recent audit entries, newest first, with the full state before and after each one."""
+    entries = list_recent_audit_logs(entity_type, entity_id, limit=limit)
+    entries.reverse()
+    base = None
+    if entries and not entries[0].get("snapshot") and entries[0].get("before"):
+        base = get_entity_as_of(entity_type, entity_id, entries[0].get("timestamp"), inclusive=False)
+    rebuild_audit_states(entries, base)
+    entries.reverse()
+    return entries
+
+
+def get_entity_as_of(entity_type, entity_id, timestamp, inclusive=True):
+    """Rebuild the entity as it was at `timestamp` from the closest snapshot and the patches after it."""
+    admin = get_admin_client()
+    at_or_before = "lte" if inclusive else "lt"
+    snapshot_query = (
+        admin.table("audit_logs")
+        .select("timestamp,snapshot")
+        .eq("entity_type", entity_type)
+        .eq("entity_id", str(entity_id))
+        .not_.is_("snapshot", "null")
+    )
+    snapshot_query = getattr(snapshot_query, at_or_before)("timestamp", timestamp)
+    snapshots = snapshot_query.order("timestamp", desc=True).limit(1).execute()
+    base = snapshots.data[0] if snapshots.data else None
+    query = (
+        admin.table("audit_logs")
+        .select("timestamp,before,after,snapshot")
+        .eq("entity_type", entity_type)
+        .eq("entity_id", str(entity_id))
+    )
+    query = getattr(query, at_or_before)("timestamp", timestamp)
+    if base:
+        query = query.gt("timestamp", base["timestamp"])
+    entries = [dict(row) for row in query.order("timestamp").execute().data]
+    pending = get_audit_writer().pending(entity_type, entity_id)
+    pending.sort(key=lambda event: event.get("timestamp") or "")
+    for event in pending:
+        moment = event.get("timestamp") or ""
+        if moment < timestamp or (inclusive and moment == timestamp):
+            entries.append(event)
+    if not entries and not base:
+        return None
+    rebuild_audit_states(entries, base["snapshot"] if base else None)
+    return entries[-1]["state_after"] if entries else dict(base["snapshot"])
+
+
+def list_audit_logs_page(actor, after=None, page_size=1000):
+    admin = get_admin_client()
+    query = admin.table("audit_logs").select("*")
+    role = actor.get("role")
+    if role == "JEFE":
+        query = query.eq("team_id", actor.get("team_id"))
+    elif role != "ADMIN":
+        query = query.eq("actor_user_id", actor.get("uid"))
+    position = decode_cursor(after)
+    if after and not position:
+        raise ValueError("invalid_cursor")
+    if position:
+        timestamp, log_id = position
+        query = query.or_(f'timestamp.lt."{timestamp}",and(timestamp.eq."{timestamp}",id.lt.{log_id})')
+    result = query.order("timestamp", desc=True).order("id", desc=True).limit(page_size + 1).execute()
+    rows = [dict(row) for row in result.data]
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(rows[-1].get("timestamp"), rows[-1].get("id")) if rows and has_more else None
+    return {"logs": rows, "next_cursor": next_cursor}
+
+
+def flush_audit_log():
+    get_audit_writer().flush()
+
+
+def replay_audit_spool():
+    writer = get_audit_writer()
+    path = writer.spool_path
+    if not path or not os.path.exists(path):
+        return 0
+    replay_path = f"{path}.replay"
+    with writer._spool_lock:
+        os.replace(path, replay_path)
+    with open(replay_path, encoding="utf-8") as handle:
+        events = [json.loads(line) for line in handle if line.strip()]
+    writer._write(events)
+    os.remove(replay_path)
+    return len(events)
+
+
+def _take_snapshot(entity_type, entity_id):
+    every = int(os.environ.get("AUDIT_SNAPSHOT_EVERY", "20"))
+    key = (entity_type, str(entity_id))
+    counts = _get_snapshot_counts()
+    with _snapshot_lock:
+        count = counts.get(key)
+        if count is None:
+            count = random.randrange(max(1, every))
+        take = count + 1 >= every
+        counts.set(key, 0 if take else count + 1)
+    return take
+
+
+def _reset_snapshot_count(entity_type, entity_id):
+    _get_snapshot_counts().set((entity_type, str(entity_id)), 0)
+
+
+def _get_snapshot_counts():
+    global _snapshot_counts
+    if _snapshot_counts is None:
+        _snapshot_counts = TTLCache(maxsize=int(os.environ.get("AUDIT_SNAPSHOT_CACHE_SIZE", "10000")), ttl=60 * 60 * 24)
+    return _snapshot_counts
+
+
+def get_audit_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = AuditWriter(
+                    batch_size=int(os.environ.get("AUDIT_BATCH_SIZE", "50")),
+                    flush_interval=float(os.environ.get("AUDIT_FLUSH_INTERVAL", "1.0")),
+                    spool_path=os.environ.get("AUDIT_SPOOL_PATH", "/tmp/hyla-audit-spool.jsonl"),
+                    sync=background_mode("AUDIT_MODE") == "sync",
+                )
+                atexit.register(_writer.close)
+    return _writer
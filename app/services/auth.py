@@ -1,7 +1,17 @@
+import hashlib
+import os
+import time
+from types import SimpleNamespace
+
+import jwt
 from flask import session
 
+from app.services.cache import TTLCache
 from app.services.supabase import get_public_client
 
+_token_cache = None
+_jwks_client = None
+
 
 def login_with_email_password(email, password):
     client = get_public_client()
@@ -19,6 +29,104 @@ def login_with_email_password(email, password):
 
 
 def verify_access_token(token):
+    if not token:
+        return None
+    cache = _get_token_cache()
+    key = _token_key(token)
+    now = time.time()
+    entry = cache.get(key)
+    if entry and entry["exp"] > now:
+        if not _revocation_check_due(entry, now):
+            return entry["user"]
+        if _is_revoked(token):
+            cache.pop(key)
+            return None
+        entry["checked_at"] = now
+        return entry["user"]
+    if _local_verification_enabled():
+        claims = _decode_token(token)
+        if not claims:
+            return None
+        user = _user_from_claims(claims)
+    else:
+        user = _get_remote_user(token)
+        if not user:
+            return None
+        claims = _unverified_claims(token)
+    exp = claims.get("exp") or now + cache.ttl
+    cache.set(key, {"user": user, "exp": exp, "checked_at": now}, ttl=min(cache.ttl, exp - now))
+    return user
+
+
+def logout_user():
+    token = session.pop("access_token", None)
+    session.pop("refresh_token", None)
+    if token:
+        _get_token_cache().pop(_token_key(token))
+
+
+def _get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TTLCache(
+            maxsize=int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "1024")),
+            ttl=int(os.environ.get("AUTH_TOKEN_CACHE_TTL", "300")),
+        )
+    return _token_cache
+
+
+def _token_key(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _local_verification_enabled():
+    return bool(os.environ.get("SUPABASE_JWT_SECRET") or os.environ.get("SUPABASE_JWKS_URL"))
+
+
+def _decode_token(token):
+    audience = os.environ.get("SUPABASE_JWT_AUDIENCE", "authenticated")
+    options = {"require": ["exp", "sub"]}
+    secret = os.environ.get("SUPABASE_JWT_SECRET")
+    try:
+        if secret:
+            return jwt.decode(token, secret, algorithms=["HS256"], audience=audience, options=options)
+        signing_key = _get_jwks_client().get_signing_key_from_jwt(token)
+        return jwt.decode(
+            token,
+            signing_key.key,
+            algorithms=["RS256", "ES256"],
+            audience=audience,
+            options=options,
+        )
+    except jwt.PyJWTError:
+        return None
+
+
+def _get_jwks_client():
+    global _jwks_client
+    if _jwks_client is None:
+        _jwks_client = jwt.PyJWKClient(os.environ.get("SUPABASE_JWKS_URL"), cache_keys=True, lifespan=3600)
+    return _jwks_client
+
+
+def _unverified_claims(token):
+    try:
+        return jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return {}
+
+
+def _user_from_claims(claims):
+    return SimpleNamespace(
+        id=claims.get("sub"),
+        email=claims.get("email"),
+        role=claims.get("role"),
+        user_metadata=claims.get("user_metadata") or {},
+        app_metadata=claims.get("app_metadata") or {},
+    )
+
+
+def _get_remote_user(token):
     client = get_public_client()
     try:
         user = client.auth.get_user(token)
@@ -27,6 +135,19 @@ def verify_access_token(token):
         return None
 
 
-def logout_user():
-    session.pop("access_token", None)
-    session.pop("refresh_token", None)
+def _revocation_check_due(entry, now):
+    interval = int(os.environ.get("AUTH_REVOCATION_CHECK_SECONDS", "0"))
+    return interval > 0 and now - entry["checked_at"] >= interval
+
+
+def _is_revoked(token):
+    from gotrue.errors import AuthApiError
+
+    client = get_public_client()
+    try:
+        response = client.auth.get_user(token)
+        return not response or not response.user
+    except AuthApiError:
+        return True
+    except Exception:
+        return False
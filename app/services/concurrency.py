@@ -0,0 +1,42 @@
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = None
+
+
+def fetch_concurrently(**calls):
+    """Run independent reads in parallel and return their results by name.
+
+    Each value is a zero-argument callable. Calls run in a shared thread pool
+    with a copy of the caller's context, so Flask's `g` and request state stay
+    available. The first exception is re-raised once every call has finished.
+    """
+    if len(calls) <= 1 or _max_workers() <= 1:
+        return {name: call() for name, call in calls.items()}
+    executor = _get_executor()
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, call)
+        for name, call in calls.items()
+    }
+    results = {}
+    error = None
+    for name, future in futures.items():
+        try:
+            results[name] = future.result()
+        except Exception as exc:
+            error = error or exc
+    if error:
+        raise error
+    return results
+
+
+def _max_workers():
+    return int(os.environ.get("FANOUT_WORKERS", "8"))
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_max_workers(), thread_name_prefix="fanout")
+    return _executor
@@ -0,0 +1,129 @@
+import logging
+from datetime import datetime, timedelta
+
+from app.services.supabase import get_admin_client
+from app.services.leads import list_leads
+from app.services.rollup import rollup_enabled
+
+logger = logging.getLogger(__name__)
+
+# PostgREST (function not in the schema cache) and Postgres (undefined_function).
+MISSING_FUNCTION_CODES = ("PGRST202", "42883")
+
+
+def get_dashboard_counters(actor, now=None):
+    now = now or datetime.utcnow()
+    scope = {
+        "p_role": actor.get("role"),
+        "p_team_id": actor.get("team_id"),
+        "p_uid": actor.get("uid"),
+    }
+    counters = None
+    if rollup_enabled():
+        counters = _rpc_counters("lead_metrics_rollup_counters", {**scope, "p_today": now.date().isoformat()})
+    if not counters:
+        counters = _rpc_counters("lead_dashboard_counters", {**scope, "p_now": now.isoformat() + "+00:00"})
+    if not counters:
+        leads = list_leads(actor, columns="status,created_at,updated_at")
+        counters = _counters_from_leads(leads, now)
+    return counters
+
+
+def get_scope_version(actor):
+    """Lead count and newest `updated_at` in the actor's scope, from one indexed RPC.
+
+    Returns None when the `lead_scope_version` function is not installed.
+    """
+    scope = {
+        "p_role": actor.get("role"),
+        "p_team_id": actor.get("team_id"),
+        "p_uid": actor.get("uid"),
+    }
+    version = _rpc_counters("lead_scope_version", scope)
+    if version is None:
+        return None
+    return version.get("total"), version.get("latest")
+
+
+def _rpc_counters(function_name, params):
+    admin = get_admin_client()
+    try:
+        result = admin.rpc(function_name, params).execute()
+    except Exception as error:
+        # Only a missing function falls back; timeouts and server errors must
+        # not turn into a full scan of the scope while the database is slow.
+        if not _function_missing(error):
+            raise
+        logger.warning("Falta la función %s en Supabase; se usa el cálculo alternativo", function_name)
+        return None
+    return result.data or None
+
+
+def _function_missing(error):
+    code = getattr(error, "code", None)
+    return code in MISSING_FUNCTION_CODES or any(code in str(error) for code in MISSING_FUNCTION_CODES)
+
+
+def _counters_from_leads(leads, now):
+    start_30 = now - timedelta(days=30)
+    start_7 = now - timedelta(days=6)
+    activity_counts = {(start_7 + timedelta(days=i)).date(): 0 for i in range(7)}
+    counters = {
+        "activos": 0,
+        "demo_agendada": 0,
+        "venta_cerrada": 0,
+        "nuevos": 0,
+        "en_proceso": 0,
+        "vendidos": 0,
+        "demos_total": 0,
+        "ventas_total": 0,
+        "no_contact_count": 0,
+        "total_leads": len(leads),
+    }
+
+    for lead in leads:
+        status = lead.get("status")
+        created_at = _parse_dt(lead.get("created_at"))
+        updated_at = _parse_dt(lead.get("updated_at"))
+
+        if status != "NO_INTERESADO":
+            counters["activos"] += 1
+        if status == "DEMO_AGENDADA":
+            counters["demo_agendada"] += 1
+        if status == "VENTA_CERRADA":
+            counters["venta_cerrada"] += 1
+
+        if not created_at or created_at >= start_30:
+            if status == "NUEVO":
+                counters["nuevos"] += 1
+            elif status in {"CONTACTADO", "DEMO_AGENDADA", "DEMO_REALIZADA"}:
+                counters["en_proceso"] += 1
+            elif status == "VENTA_CERRADA":
+                counters["vendidos"] += 1
+
+        if updated_at and updated_at.date() in activity_counts and status == "DEMO_REALIZADA":
+            activity_counts[updated_at.date()] += 1
+
+        if updated_at and updated_at >= start_30 and status in {"DEMO_REALIZADA", "VENTA_CERRADA"}:
+            counters["demos_total"] += 1
+            if status == "VENTA_CERRADA":
+                counters["ventas_total"] += 1
+
+        if status == "NUEVO" and created_at and created_at <= now - timedelta(hours=48):
+            counters["no_contact_count"] += 1
+
+    counters["activity_7d"] = [
+        {"day": day.isoformat(), "count": count} for day, count in activity_counts.items()
+    ]
+    return counters
+
+
+def _parse_dt(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+        except ValueError:
+            return None
+    return None
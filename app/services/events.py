@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from app.services.rbac import can_access_lead
+
+logger = logging.getLogger(__name__)
+
+LEAD_EVENT_FIELDS = (
+    "id",
+    "first_name",
+    "last_name",
+    "whatsapp_number",
+    "status",
+    "demo_user_id",
+    "owner_user_id",
+    "team_id",
+    "city",
+    "created_at",
+    "updated_at",
+)
+LEAD_SCOPE_FIELDS = ("status", "owner_user_id", "team_id")
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Subscription:
+    def __init__(self, broker, maxsize):
+        self._broker = broker
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                pass
+            self._queue.put_nowait(event)
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """Fans events out to the subscribers of this process."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(self, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        self.dispatch(event)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+class RedisBroker(InProcessBroker):
+    """Publishes through Redis so every worker's subscribers receive each event."""
+
+    def __init__(self, url, channel="hyla:lead-events", queue_size=100):
+        import redis
+
+        super().__init__(queue_size)
+        self.channel = channel
+        self._redis = redis.Redis.from_url(url)
+        self._listener = threading.Thread(target=self._listen, name="lead-events", daemon=True)
+        self._listener.start()
+
+    def publish(self, event):
+        try:
+            self._redis.publish(self.channel, json.dumps(event, default=str))
+        except Exception:
+            logger.exception("No se pudo publicar el evento en Redis; se entrega solo en este proceso")
+            self.dispatch(event)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                for message in pubsub.listen():
+                    self.dispatch(json.loads(message["data"]))
+            except Exception:
+                logger.exception("Se perdió la suscripción a Redis; reintentando")
+                time.sleep(1)
+
+
+def live_events_enabled():
+    """Live updates are opt-in: each open stream holds a server thread."""
+    return bool(os.environ.get("EVENTS_BACKEND"))
+
+
+def get_event_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = _create_broker()
+    return _broker
+
+
+def publish_lead_event(action, before, after):
+    if not after or not live_events_enabled():
+        return
+    event = {
+        "type": "lead",
+        "action": action,
+        "lead": {field: after.get(field) for field in LEAD_EVENT_FIELDS},
+        "before": {field: before.get(field) for field in LEAD_SCOPE_FIELDS} if before else None,
+    }
+    try:
+        get_event_broker().publish(event)
+    except Exception:
+        logger.exception("No se pudo publicar el evento de la demo %s", after.get("id"))
+
+
+def lead_event_for(actor, event):
+    """Shape `event` for `actor`, or return None when it is outside their scope."""
+    lead = event.get("lead") or {}
+    before = event.get("before")
+    visible = can_access_lead(actor, lead)
+    was_visible = bool(before) and can_access_lead(actor, before)
+    if not visible and not was_visible:
+        return None
+    return {
+        "action": event.get("action"),
+        "visible": visible,
+        "previous_status": before.get("status") if was_visible else None,
+        "lead": lead if visible else {"id": lead.get("id")},
+    }
+
+
+def _create_broker():
+    backend = os.environ.get("EVENTS_BACKEND", "memory").lower()
+    queue_size = int(os.environ.get("EVENTS_QUEUE_SIZE", "100"))
+    if backend == "redis":
+        return RedisBroker(os.environ.get("EVENTS_REDIS_URL", "redis://localhost:6379/0"), queue_size=queue_size)
+    return InProcessBroker(queue_size=queue_size)
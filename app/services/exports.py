@@ -0,0 +1,187 @@
+import csv
+import io
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from app.services.audit import list_audit_logs_page
+from app.services.leads import list_leads_page
+from app.services.utils import decode_cursor
+
+EXPORT_PAGE_SIZE = 1000
+
+LEAD_EXPORT_COLUMNS = [
+    "id",
+    "first_name",
+    "last_name",
+    "occupation",
+    "whatsapp_number",
+    "address_line",
+    "city",
+    "region",
+    "country",
+    "status",
+    "notes",
+    "owner_user_id",
+    "demo_user_id",
+    "team_id",
+    "created_at",
+    "updated_at",
+]
+
+AUDIT_EXPORT_COLUMNS = [
+    "timestamp",
+    "actor_user_id",
+    "actor_name",
+    "action",
+    "entity_type",
+    "entity_id",
+    "team_id",
+    "before",
+    "after",
+    "snapshot",
+]
+
+_XML_INVALID_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def iter_lead_rows(actor, status_filter=None, search=None):
+    cursor = None
+    while True:
+        page = list_leads_page(
+            actor,
+            status_filter=status_filter,
+            after=cursor,
+            page_size=EXPORT_PAGE_SIZE,
+            columns=",".join(LEAD_EXPORT_COLUMNS),
+            search=search,
+        )
+        for lead in page["leads"]:
+            yield [lead.get(column) for column in LEAD_EXPORT_COLUMNS]
+        cursor = _next_cursor(page)
+        if not cursor:
+            return
+
+
+def iter_audit_rows(actor):
+    cursor = None
+    while True:
+        page = list_audit_logs_page(actor, after=cursor, page_size=EXPORT_PAGE_SIZE)
+        for log in page["logs"]:
+            row = [log.get(column) for column in AUDIT_EXPORT_COLUMNS]
+            yield [json.dumps(value, default=str) if isinstance(value, (dict, list)) else value for value in row]
+        cursor = _next_cursor(page)
+        if not cursor:
+            return
+
+
+def _next_cursor(page):
+    # An undecodable cursor (e.g. a row without timestamp) would restart the
+    # paging from the first page and never finish.
+    cursor = page["next_cursor"]
+    if cursor and not decode_cursor(cursor):
+        raise ValueError("invalid_cursor")
+    return cursor
+
+
+def stream_csv(header, rows, flush_every=500):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    for index, row in enumerate(rows, start=1):
+        writer.writerow(["" if value is None else value for value in row])
+        if index % flush_every == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def stream_xlsx(header, rows, flush_every=500):
+    output = _DrainableStream()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b"<sheetData>"
+            )
+            sheet.write(_xlsx_row(header))
+            for index, row in enumerate(rows, start=1):
+                sheet.write(_xlsx_row(row))
+                if index % flush_every == 0:
+                    yield output.drain()
+            sheet.write(b"</sheetData></worksheet>")
+    yield output.drain()
+
+
+def _xlsx_row(values):
+    cells = []
+    for value in values:
+        if value is None or value == "":
+            cells.append("<c/>")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            cells.append(f"<c><v>{value}</v></c>")
+        else:
+            text = _XML_INVALID_CHARS.sub("", str(value))
+            cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>')
+    return f"<row>{''.join(cells)}</row>".encode("utf-8")
+
+
+class _DrainableStream(io.RawIOBase):
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Datos" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        "</Relationships>"
+    ),
+}
@@ -0,0 +1,79 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.supabase import get_admin_client
+from app.services.utils import background_mode
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS = (
+    ("full", 2048, 82),
+    ("medium", 1024, 80),
+    ("thumb", 320, 75),
+)
+
+_executor = None
+
+
+def schedule_image_processing(bucket, lead_id, image_id, raw_path, file_bytes):
+    if background_mode("IMAGE_PROCESSING") == "sync":
+        process_lead_image(bucket, lead_id, image_id, raw_path, file_bytes)
+        return
+    _get_executor().submit(process_lead_image, bucket, lead_id, image_id, raw_path, file_bytes)
+
+
+def process_lead_image(bucket, lead_id, image_id, raw_path, file_bytes):
+    try:
+        variants = render_variants(file_bytes)
+        admin = get_admin_client()
+        storage = admin.storage.from_(bucket)
+        paths = {}
+        for name, content in variants.items():
+            suffix = "" if name == "full" else f"-{name}"
+            path = f"leads/{lead_id}/{image_id}{suffix}.webp"
+            storage.upload(
+                path,
+                content,
+                file_options={"content-type": "image/webp", "cache-control": "31536000", "upsert": "true"},
+            )
+            paths[name] = path
+        admin.table("lead_images").update(
+            {
+                "storage_path": paths["full"],
+                "medium_path": paths["medium"],
+                "thumb_path": paths["thumb"],
+            }
+        ).eq("id", image_id).execute()
+        if raw_path != paths["full"]:
+            storage.remove([raw_path])
+    except Exception:
+        logger.exception("No se pudo procesar la imagen %s", image_id)
+
+
+def render_variants(file_bytes):
+    from PIL import Image, ImageOps
+
+    variants = {}
+    with Image.open(io.BytesIO(file_bytes)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in {"RGB", "RGBA"}:
+            image = image.convert("RGBA" if "transparency" in image.info or "A" in image.getbands() else "RGB")
+        for name, max_side, quality in IMAGE_VARIANTS:
+            variant = image.copy()
+            variant.thumbnail((max_side, max_side))
+            buffer = io.BytesIO()
+            variant.save(buffer, format="WEBP", quality=quality, method=4)
+            variants[name] = buffer.getvalue()
+    return variants
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get("IMAGE_WORKERS", "2")),
+            thread_name_prefix="lead-images",
+        )
+    return _executor
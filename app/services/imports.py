@@ -0,0 +1,127 @@
+import csv
+import io
+import itertools
+import unicodedata
+from datetime import datetime
+
+from app.services.supabase import get_admin_client
+from app.services.audit import log_events
+from app.services.rollup import record_lead_metrics_many
+from app.services.utils import demo_assignable_roles, is_valid_whatsapp, lead_statuses
+
+IMPORT_COLUMN_ALIASES = {
+    "first_name": {"first_name", "nombre"},
+    "last_name": {"last_name", "apellido"},
+    "occupation": {"occupation", "ocupacion"},
+    "whatsapp_number": {"whatsapp_number", "whatsapp", "telefono"},
+    "address_line": {"address_line", "direccion"},
+    "city": {"city", "ciudad", "comuna", "comuna/ciudad"},
+    "region": {"region"},
+    "country": {"country", "pais"},
+    "status": {"status", "estado"},
+    "notes": {"notes", "notas"},
+}
+
+
+def import_leads_csv(actor, stream, chunk_size=500, encoding="utf-8-sig"):
+    if isinstance(stream, (bytes, bytearray)):
+        stream = io.BytesIO(stream)
+    handle = io.TextIOWrapper(stream, encoding=encoding, newline="") if _is_binary(stream) else stream
+    header_line = handle.readline()
+    if not header_line.strip():
+        return {"inserted": 0, "errors": [{"row": 1, "error": "El archivo está vacío."}]}
+    delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+    reader = csv.reader(itertools.chain([header_line], handle), delimiter=delimiter)
+    columns = _map_columns(next(reader))
+    missing = {"first_name", "last_name", "whatsapp_number"} - set(columns.values())
+    if missing:
+        return {
+            "inserted": 0,
+            "errors": [{"row": 1, "error": f"Faltan columnas: {', '.join(sorted(missing))}."}],
+        }
+
+    report = {"inserted": 0, "errors": []}
+    chunk = []
+    for row_number, values in enumerate(reader, start=2):
+        if not any(value.strip() for value in values):
+            continue
+        lead, error = _build_lead(actor, columns, values)
+        if error:
+            report["errors"].append({"row": row_number, "error": error})
+            continue
+        chunk.append((row_number, lead))
+        if len(chunk) >= chunk_size:
+            _insert_chunk(actor, chunk, report)
+            chunk = []
+    if chunk:
+        _insert_chunk(actor, chunk, report)
+    return report
+
+
+def _insert_chunk(actor, chunk, report):
+    admin = get_admin_client()
+    now = datetime.utcnow().isoformat()
+    rows = [{**lead, "created_at": now, "updated_at": now} for _, lead in chunk]
+    try:
+        result = admin.table("leads").insert(rows).execute()
+    except Exception as exc:
+        report["errors"].extend({"row": row_number, "error": f"Error al guardar: {exc}"} for row_number, _ in chunk)
+        return
+    inserted = [dict(row) for row in result.data]
+    report["inserted"] += len(inserted)
+    record_lead_metrics_many([(None, lead) for lead in inserted])
+    log_events(
+        actor=actor,
+        action="IMPORT",
+        entity_type="lead",
+        entries=[
+            {"entity_id": lead["id"], "team_id": lead.get("team_id"), "after": lead}
+            for lead in inserted
+        ],
+    )
+
+
+def _build_lead(actor, columns, values):
+    data = {field: "" for field in IMPORT_COLUMN_ALIASES}
+    for index, value in enumerate(values):
+        field = columns.get(index)
+        if field:
+            data[field] = value.strip()
+    if not data["first_name"] or not data["last_name"]:
+        return None, "Nombre y apellido son obligatorios."
+    whatsapp = "".join(ch for ch in data["whatsapp_number"] if not ch.isspace()).lstrip("+")
+    if not is_valid_whatsapp(whatsapp):
+        return None, "WhatsApp inválido. Usa solo dígitos (9-15)."
+    status = (data["status"] or "NUEVO").strip().upper().replace(" ", "_")
+    if status not in lead_statuses():
+        return None, f"Estado inválido: {data['status']}."
+    demo_user_id = actor.get("uid") if actor.get("role") in demo_assignable_roles() else None
+    return {
+        **data,
+        "whatsapp_number": whatsapp,
+        "country": data["country"] or "Chile",
+        "status": status,
+        "demo_user_id": demo_user_id,
+        "owner_user_id": actor.get("uid"),
+        "team_id": actor.get("team_id"),
+    }, None
+
+
+def _map_columns(header):
+    columns = {}
+    for index, name in enumerate(header):
+        normalized = _normalize_header(name)
+        for field, aliases in IMPORT_COLUMN_ALIASES.items():
+            if normalized in aliases and field not in columns.values():
+                columns[index] = field
+                break
+    return columns
+
+
+def _normalize_header(name):
+    decomposed = unicodedata.normalize("NFKD", name.strip().lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).replace(" ", "_")
+
+
+def _is_binary(stream):
+    return not isinstance(stream, io.TextIOBase)
@@ -1,24 +1,123 @@
 import os
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from app.services.supabase import get_admin_client
-from app.services.audit import log_event
-from app.services.utils import allowed_image_extension
+from app.services.audit import log_event, log_events
+from app.services.cache import TTLCache
+from app.services.events import publish_lead_event
+from app.services.images import schedule_image_processing
+from app.services.rollup import record_lead_metrics, record_lead_metrics_many
+from app.services.utils import allowed_image_extension, decode_cursor, encode_cursor, is_valid_uuid
 
+LEAD_LIST_COLUMNS = "id,first_name,last_name,whatsapp_number,status,demo_user_id,owner_user_id,team_id,city,created_at,updated_at"
+# pg_trgm only uses the trigram index for patterns of 3+ characters.
+MIN_SEARCH_TERM_LENGTH = 3
+SIGNED_URL_EXPIRES_IN = 60 * 60 * 6
+SIGNED_URL_REFRESH_MARGIN = 60 * 15
 
-def list_leads(actor, status_filter=None):
+_signed_url_cache = None
+
+
+def list_leads(actor, status_filter=None, columns="*"):
     admin = get_admin_client()
-    query = admin.table("leads").select("*").order("created_at", desc=True)
-    role = actor.get("role")
-    if role == "JEFE":
-        query = query.eq("team_id", actor.get("team_id"))
-    elif role in {"VENDEDOR", "RECLUTA"}:
-        query = query.eq("owner_user_id", actor.get("uid"))
+    query = _scoped_leads_query(admin, actor, columns, status_filter)
+    result = query.order("created_at", desc=True).order("id", desc=True).execute()
+    return [dict(row) for row in result.data]
+
+
+def list_leads_page(
+    actor,
+    status_filter=None,
+    after=None,
+    before=None,
+    page_size=50,
+    columns=LEAD_LIST_COLUMNS,
+    search=None,
+):
+    admin = get_admin_client()
+    query = _scoped_leads_query(admin, actor, columns, status_filter, search)
+    backwards = bool(before) and not after
+    position = decode_cursor(before if backwards else after)
+    if position:
+        created_at, lead_id = position
+        op = "gt" if backwards else "lt"
+        query = query.or_(
+            f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}.{lead_id})'
+        )
+    result = (
+        query.order("created_at", desc=not backwards)
+        .order("id", desc=not backwards)
+        .limit(page_size + 1)
+        .execute()
+    )
+    rows = [dict(row) for row in result.data]
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+        next_cursor = _lead_cursor(rows[-1]) if rows else None
+        prev_cursor = _lead_cursor(rows[0]) if rows and has_more else None
+    else:
+        next_cursor = _lead_cursor(rows[-1]) if rows and has_more else None
+        prev_cursor = _lead_cursor(rows[0]) if rows and position else None
+    return {"leads": rows, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+
+
+def list_pending_leads(actor, now=None, limit=100):
+    admin = get_admin_client()
+    now = now or datetime.utcnow()
+    stale_before = (now - timedelta(days=3)).isoformat() + "+00:00"
+    query = _scoped_leads_query(admin, actor, "id,first_name,last_name,status,created_at")
+    result = (
+        query.or_(f'status.eq.DEMO_REALIZADA,and(status.eq.NUEVO,created_at.lt."{stale_before}")')
+        .order("created_at", desc=True)
+        .order("id", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    return [dict(row) for row in result.data]
+
+
+def search_leads(actor, search, limit=8):
+    if len(search_terms(search)) == 0:
+        return []
+    admin = get_admin_client()
+    query = _scoped_leads_query(
+        admin,
+        actor,
+        "id,first_name,last_name,whatsapp_number,city,status",
+        search=search,
+    )
+    result = query.order("created_at", desc=True).order("id", desc=True).limit(limit).execute()
+    return [dict(row) for row in result.data]
+
+
+def search_terms(search):
+    cleaned = "".join(ch if ch.isalnum() or ch in "@.-" else " " for ch in (search or "").lower())
+    return [term for term in cleaned.split() if len(term) >= MIN_SEARCH_TERM_LENGTH][:5]
+
+
+def _scoped_leads_query(admin, actor, columns, status_filter=None, search=None):
+    query = _scope_leads(admin.table("leads").select(columns), actor)
     if status_filter:
         query = query.eq("status", status_filter)
-    result = query.execute()
-    return [dict(row) for row in result.data]
+    for term in search_terms(search):
+        query = query.ilike("search_text", f"*{term}*")
+    return query
+
+
+def _scope_leads(query, actor):
+    role = actor.get("role")
+    if role == "JEFE":
+        return query.eq("team_id", actor.get("team_id"))
+    if role in {"VENDEDOR", "RECLUTA"}:
+        return query.eq("owner_user_id", actor.get("uid"))
+    return query
+
+
+def _lead_cursor(lead):
+    return encode_cursor(lead.get("created_at"), lead.get("id"))
 
 
 def create_lead(actor, data):
@@ -32,7 +131,10 @@ def create_lead(actor, data):
         "updated_at": now,
     }
     result = admin.table("leads").insert(lead_data).execute()
-    lead_id = result.data[0]["id"]
+    created = dict(result.data[0])
+    lead_id = created["id"]
+    record_lead_metrics(None, lead_data)
+    publish_lead_event("created", None, created)
     log_event(
         actor=actor,
         action="CREATE",
@@ -40,7 +142,7 @@ def create_lead(actor, data):
         entity_id=lead_id,
         team_id=actor.get("team_id"),
         before=None,
-        after=lead_data,
+        after=created,
     )
     return lead_id
 
@@ -53,12 +155,20 @@ def get_lead(lead_id):
     return dict(result.data[0])
 
 
-def update_lead(actor, lead_id, updates):
+def update_lead(actor, lead_id, updates, before=None, expected_updated_at=None):
     admin = get_admin_client()
-    before = get_lead(lead_id)
+    if before is None:
+        before = get_lead(lead_id)
     updates["updated_at"] = datetime.utcnow().isoformat()
-    admin.table("leads").update(updates).eq("id", lead_id).execute()
-    after = get_lead(lead_id)
+    query = admin.table("leads").update(updates).eq("id", lead_id)
+    if expected_updated_at:
+        query = query.eq("updated_at", expected_updated_at)
+    result = query.execute()
+    if not result.data:
+        raise ValueError("stale_lead" if expected_updated_at else "lead_not_found")
+    after = dict(result.data[0])
+    record_lead_metrics(before, after)
+    publish_lead_event("updated", before, after)
     action = "UPDATE"
     if "status" in updates:
         action = "STATUS_CHANGE"
@@ -76,6 +186,38 @@ def update_lead(actor, lead_id, updates):
     return after
 
 
+def bulk_update_leads(actor, lead_ids, updates):
+    lead_ids = [lead_id for lead_id in dict.fromkeys(lead_ids) if is_valid_uuid(lead_id)]
+    if not lead_ids:
+        return []
+    admin = get_admin_client()
+    before_result = _scoped_leads_query(admin, actor, "*").in_("id", lead_ids).execute()
+    before_by_id = {row["id"]: dict(row) for row in before_result.data}
+    if not before_by_id:
+        return []
+    updates = {**updates, "updated_at": datetime.utcnow().isoformat()}
+    result = _scope_leads(admin.table("leads").update(updates).in_("id", list(before_by_id)), actor).execute()
+    updated = [dict(row) for row in result.data]
+    record_lead_metrics_many([(before_by_id.get(lead["id"]), lead) for lead in updated])
+    for lead in updated:
+        publish_lead_event("updated", before_by_id.get(lead["id"]), lead)
+    log_events(
+        actor=actor,
+        action="STATUS_CHANGE" if "status" in updates else "UPDATE",
+        entity_type="lead",
+        entries=[
+            {
+                "entity_id": lead["id"],
+                "team_id": lead.get("team_id"),
+                "before": before_by_id.get(lead["id"]),
+                "after": lead,
+            }
+            for lead in updated
+        ],
+    )
+    return updated
+
+
 def list_lead_images(lead_id):
     admin = get_admin_client()
     result = (
@@ -86,18 +228,65 @@ def list_lead_images(lead_id):
         .execute()
     )
     bucket = os.environ.get("SUPABASE_STORAGE_BUCKET", "lead-images")
+    rows = [dict(row) for row in result.data]
+    paths = [row.get(column) for row in rows for column in ("storage_path", "medium_path", "thumb_path")]
+    signed_urls = _signed_urls(admin, bucket, [path for path in paths if path])
     images = []
-    for row in result.data:
-        item = dict(row)
+    for item in rows:
         storage_path = item.get("storage_path")
         if storage_path:
-            signed = admin.storage.from_(bucket).create_signed_url(storage_path, 60 * 60 * 6)
-            url = signed.get("signedURL") or signed.get("signedUrl") or item.get("url") or ""
-            item["url"] = url
+            item["url"] = signed_urls.get(storage_path) or item.get("url") or ""
+        item["medium_url"] = signed_urls.get(item.get("medium_path")) or item.get("url")
+        item["thumb_url"] = signed_urls.get(item.get("thumb_path")) or item["medium_url"]
         images.append(item)
     return images
 
 
+def _signed_urls(admin, bucket, paths):
+    cache = _get_signed_url_cache()
+    urls = {}
+    missing = []
+    for path in paths:
+        url = cache.get((bucket, path))
+        if url:
+            urls[path] = url
+        else:
+            missing.append(path)
+    if not missing:
+        return urls
+    storage = admin.storage.from_(bucket)
+    try:
+        signed = storage.create_signed_urls(missing, SIGNED_URL_EXPIRES_IN)
+    except Exception:
+        # storage3 raises for the whole batch when any path fails to sign
+        # (e.g. a deleted object); sign one by one to keep the others.
+        signed = [_signed_url_item(storage, path) for path in missing]
+    for item in signed:
+        url = item.get("signedURL") or item.get("signedUrl")
+        path = item.get("path")
+        if path and url and not item.get("error"):
+            urls[path] = url
+            cache.set((bucket, path), url)
+    return urls
+
+
+def _signed_url_item(storage, path):
+    try:
+        return {"path": path, **storage.create_signed_url(path, SIGNED_URL_EXPIRES_IN)}
+    except Exception:
+        return {"path": path, "error": "sign_failed"}
+
+
+def _get_signed_url_cache():
+    global _signed_url_cache
+    if _signed_url_cache is None:
+        _signed_url_cache = TTLCache(
+            maxsize=int(os.environ.get("SIGNED_URL_CACHE_SIZE", "4096")),
+            ttl=SIGNED_URL_EXPIRES_IN - SIGNED_URL_REFRESH_MARGIN,
+        )
+    return _signed_url_cache
+
+
 def upload_lead_image(actor, lead_id, file):
     filename = file.filename or ""
     if not allowed_image_extension(filename):
@@ -114,8 +303,10 @@ def upload_lead_image(actor, lead_id, file):
     bucket = os.environ.get("SUPABASE_STORAGE_BUCKET", "lead-images")
     file_bytes = file.read()
     admin.storage.from_(bucket).upload(storage_path, file_bytes, file_options={"content-type": file.content_type})
-    signed = admin.storage.from_(bucket).create_signed_url(storage_path, 60 * 60 * 6)
+    signed = admin.storage.from_(bucket).create_signed_url(storage_path, SIGNED_URL_EXPIRES_IN)
     url = signed.get("signedURL") or signed.get("signedUrl") or ""
+    if url:
+        _get_signed_url_cache().set((bucket, storage_path), url)
     data = {
         "id": image_id,
         "lead_id": lead_id,
@@ -125,6 +316,7 @@ def upload_lead_image(actor, lead_id, file):
         "uploaded_at": datetime.utcnow().isoformat(),
     }
     admin.table("lead_images").insert(data).execute()
+    schedule_image_processing(bucket, lead_id, image_id, storage_path, file_bytes)
     log_event(
         actor=actor,
         action="IMAGE_UPLOAD",
@@ -0,0 +1,159 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_REST_OPERATIONS = {"GET": "select", "HEAD": "select", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+_current_calls = contextvars.ContextVar("backend_calls", default=None)
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: {**data, "counts": list(data["counts"])} for labels, data in self._series.items()}
+        for labels, data in sorted(series.items()):
+            base = _format_labels(zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets, data["counts"]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_with_le(base, bound)} {cumulative}")
+            lines.append(f'{self.name}_bucket{_with_le(base, "+Inf")} {data["count"]}')
+            lines.append(f"{self.name}_sum{base} {data['sum']:.6f}")
+            lines.append(f"{self.name}_count{base} {data['count']}")
+        return lines
+
+
+REQUEST_LATENCY = Histogram(
+    "hyla_request_duration_seconds",
+    "Duración de los requests HTTP por ruta.",
+    ("route", "method", "status"),
+)
+BACKEND_LATENCY = Histogram(
+    "hyla_supabase_call_duration_seconds",
+    "Duración de las llamadas a Supabase por operación.",
+    ("client", "operation"),
+)
+
+
+def start_request_trace():
+    return _current_calls.set([])
+
+
+def end_request_trace(token):
+    _current_calls.reset(token)
+
+
+def request_calls():
+    return list(_current_calls.get() or [])
+
+
+def record_backend_call(client, operation, duration):
+    BACKEND_LATENCY.observe((client, operation), duration)
+    calls = _current_calls.get()
+    if calls is not None:
+        calls.append({"client": client, "operation": operation, "duration": duration})
+
+
+def observe_request(route, method, status, duration):
+    REQUEST_LATENCY.observe((route, method, str(status)), duration)
+
+
+def summarize_calls(calls):
+    summary = defaultdict(lambda: {"count": 0, "duration": 0.0})
+    for call in calls:
+        entry = summary[call["operation"]]
+        entry["count"] += 1
+        entry["duration"] += call["duration"]
+    return dict(summary)
+
+
+def server_timing_header(total, calls):
+    parts = [f"app;dur={total * 1000:.1f}"]
+    backend_total = sum(call["duration"] for call in calls)
+    if calls:
+        parts.append(f'supabase;dur={backend_total * 1000:.1f};desc="{len(calls)} llamadas"')
+    for index, (operation, entry) in enumerate(sorted(summarize_calls(calls).items())):
+        parts.append(f'sb{index};dur={entry["duration"] * 1000:.1f};desc="{operation} x{entry["count"]}"')
+    return ", ".join(parts)
+
+
+def backend_operation(method, path):
+    segments = [segment for segment in path.split("/") if segment]
+    if len(segments) >= 3 and segments[0] == "rest":
+        if segments[2] == "rpc" and len(segments) >= 4:
+            return f"rpc.{segments[3]}"
+        return f"{segments[2]}.{_REST_OPERATIONS.get(method, method.lower())}"
+    if len(segments) >= 3 and segments[0] == "auth":
+        return "auth." + ".".join(segment for segment in segments[2:4] if not _looks_like_id(segment))
+    if len(segments) >= 3 and segments[0] == "storage":
+        action = segments[3] if segments[2] == "object" and len(segments) >= 4 else segments[2]
+        if action not in {"sign", "list", "move", "copy", "public", "authenticated"}:
+            action = "upload" if method in {"POST", "PUT"} else "remove" if method == "DELETE" else "download"
+        return f"storage.{action}"
+    return f"{method.lower()}.{segments[0] if segments else 'root'}"
+
+
+def render_prometheus(extra_gauges=()):
+    lines = REQUEST_LATENCY.render() + BACKEND_LATENCY.render()
+    for name, help_text, samples in extra_gauges:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels.items())} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def timed_backend_hooks(client):
+    def on_request(request):
+        request.extensions["hyla_started"] = time.perf_counter()
+
+    def on_response(response):
+        response.read()
+        started = response.request.extensions.get("hyla_started")
+        if started is not None:
+            operation = backend_operation(response.request.method, response.request.url.path)
+            record_backend_call(client, operation, time.perf_counter() - started)
+
+    return on_request, on_response
+
+
+def _looks_like_id(segment):
+    return len(segment) >= 32 and any(ch.isdigit() for ch in segment)
+
+
+def _format_labels(pairs):
+    rendered = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f"{{{rendered}}}" if rendered else ""
+
+
+def _with_le(base, bound):
+    le = f'le="{bound}"'
+    return f"{base[:-1]},{le}}}" if base else f"{{{le}}}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,80 @@
+import logging
+import os
+from datetime import datetime, timezone
+
+from app.services.supabase import get_admin_client
+
+logger = logging.getLogger(__name__)
+
+
+def rollup_enabled():
+    return os.environ.get("LEAD_METRICS_ROLLUP", "0").lower() in {"1", "true", "yes"}
+
+
+def record_lead_metrics(before, after):
+    record_lead_metrics_many([(before, after)])
+
+
+def record_lead_metrics_many(changes):
+    if not rollup_enabled():
+        return
+    deltas = lead_metrics_deltas(changes)
+    if not deltas:
+        return
+    admin = get_admin_client()
+    try:
+        admin.rpc("apply_lead_metrics_deltas", {"p_deltas": deltas}).execute()
+    except Exception:
+        logger.exception("No se pudo actualizar lead_metrics_daily; ejecuta rebuild-lead-metrics")
+
+
+def lead_metrics_deltas(changes):
+    totals = {}
+
+    def add(lead, column, day, amount):
+        if not day:
+            return
+        key = (lead.get("team_id"), lead.get("owner_user_id"), day, lead.get("status"))
+        row = totals.setdefault(key, {"created_count": 0, "updated_count": 0, "entered_count": 0})
+        row[column] += amount
+
+    for before, after in changes:
+        if before:
+            add(before, "created_count", _day(before.get("created_at")), -1)
+            add(before, "updated_count", _day(before.get("updated_at")), -1)
+        if after:
+            add(after, "created_count", _day(after.get("created_at")), 1)
+            add(after, "updated_count", _day(after.get("updated_at")), 1)
+            if not before or before.get("status") != after.get("status"):
+                add(after, "entered_count", _day(after.get("updated_at")), 1)
+
+    return [
+        {
+            "team_id": team_id,
+            "owner_user_id": owner_user_id,
+            "day": day,
+            "status": status,
+            **counts,
+        }
+        for (team_id, owner_user_id, day, status), counts in totals.items()
+        if any(counts.values())
+    ]
+
+
+def rebuild_lead_metrics():
+    admin = get_admin_client()
+    admin.rpc("rebuild_lead_metrics_daily", {}).execute()
+
+
+def _day(value):
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, str) and value:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        if parsed.tzinfo:
+            parsed = parsed.astimezone(timezone.utc)
+        return parsed.date().isoformat()
+    return None
@@ -1,30 +1,133 @@
 import os
+import threading
+from collections import Counter
 
-from supabase import create_client
+from app.services.metrics import timed_backend_hooks
 
 _public_client = None
 _admin_client = None
+_http_sessions = {}
+_request_counts = Counter()
+_stats_lock = threading.Lock()
+_init_lock = threading.Lock()
 
 
 def init_supabase():
     global _public_client, _admin_client
-    if _public_client and _admin_client:
-        return
-    url = os.environ.get("SUPABASE_URL")
-    anon_key = os.environ.get("SUPABASE_ANON_KEY")
-    service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-    if not url or not anon_key:
-        raise RuntimeError("Falta SUPABASE_URL o SUPABASE_ANON_KEY")
-    _public_client = create_client(url, anon_key)
-    if service_key:
-        _admin_client = create_client(url, service_key)
-    else:
-        _admin_client = _public_client
+    with _init_lock:
+        if _public_client and _admin_client:
+            return
+        url = os.environ.get("SUPABASE_URL")
+        anon_key = os.environ.get("SUPABASE_ANON_KEY")
+        service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+        if not url or not anon_key:
+            raise RuntimeError("Falta SUPABASE_URL o SUPABASE_ANON_KEY")
+        _public_client = _build_client(url, anon_key, "public")
+        if service_key:
+            _admin_client = _build_client(url, service_key, "admin")
+        else:
+            _admin_client = _public_client
 
 
 def get_public_client():
+    if _public_client is None:
+        init_supabase()
     return _public_client
 
 
 def get_admin_client():
+    if _admin_client is None:
+        init_supabase()
     return _admin_client
+
+
+def http_pool_stats():
+    stats = {}
+    for name, session in list(_http_sessions.items()):
+        pool = getattr(session._transport, "_pool", None)
+        connections = list(pool.connections) if pool is not None else []
+        stats[name] = {
+            "requests": _request_counts[name],
+            "connections": len(connections),
+            "idle": sum(1 for connection in connections if connection.is_idle()),
+            "http2": sum(1 for connection in connections if _is_http2(connection)),
+        }
+    return stats
+
+
+def _build_client(url, key, name):
+    from supabase import Client, ClientOptions
+
+    class PooledClient(Client):
+        # supabase-py drops its PostgREST and Storage clients on SIGNED_IN and
+        # TOKEN_REFRESHED and rebuilds them on next use; route the rebuilt ones
+        # through the same pooled sessions.
+        def _init_postgrest_client(self, *args, **kwargs):
+            postgrest = Client._init_postgrest_client(*args, **kwargs)
+            postgrest.session = _pooled_session(f"{name}.rest", postgrest.session)
+            return postgrest
+
+        def _init_storage_client(self, *args, **kwargs):
+            storage = Client._init_storage_client(*args, **kwargs)
+            storage.session = storage._client = _pooled_session(f"{name}.storage", storage.session)
+            return storage
+
+    timeout = _http_timeout()
+    client = PooledClient.create(
+        url,
+        key,
+        options=ClientOptions(postgrest_client_timeout=timeout, storage_client_timeout=timeout),
+    )
+    auth_session = _pooled_session(f"{name}.auth", client.auth._http_client)
+    client.auth._http_client = auth_session
+    client.auth.admin._http_client = auth_session
+    return client
+
+
+def _pooled_session(name, session):
+    import httpx
+
+    pooled = _http_sessions.get(name)
+    if pooled is not None:
+        # Keep the open connections; only the headers (Authorization) change.
+        pooled.headers = session.headers
+        session.close()
+        return pooled
+
+    def count_request(request):
+        with _stats_lock:
+            _request_counts[name] += 1
+
+    start_timer, record_timing = timed_backend_hooks(name.split(".")[0])
+    pooled = httpx.Client(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=_http_timeout(),
+        limits=httpx.Limits(
+            max_connections=int(os.environ.get("SUPABASE_HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.environ.get("SUPABASE_HTTP_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.environ.get("SUPABASE_HTTP_KEEPALIVE_EXPIRY", "30")),
+        ),
+        http2=os.environ.get("SUPABASE_HTTP2", "1").lower() in {"1", "true", "yes"},
+        follow_redirects=True,
+        event_hooks={"request": [count_request, start_timer], "response": [record_timing]},
+    )
+    pooled.aclose = pooled.close
+    session.close()
+    _http_sessions[name] = pooled
+    return pooled
+
+
+def _http_timeout():
+    import httpx
+
+    read_timeout = float(os.environ.get("SUPABASE_HTTP_READ_TIMEOUT", "10"))
+    return httpx.Timeout(
+        read_timeout,
+        connect=float(os.environ.get("SUPABASE_HTTP_CONNECT_TIMEOUT", "3")),
+    )
+
+
+def _is_http2(connection):
+    inner = getattr(connection, "_connection", None)
+    return type(inner).__name__ == "HTTP2Connection"
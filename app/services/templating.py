@@ -0,0 +1,73 @@
+import os
+
+from flask import current_app
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from app.services.cache import TTLCache
+
+_CSRF_MARKER = "<!--csrf-input-->"
+
+_fragment_cache = None
+
+
+class _BytecodeCache(FileSystemBytecodeCache):
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+def is_production():
+    default = "production" if os.environ.get("VERCEL") else "development"
+    return os.environ.get("APP_ENV", default).lower() == "production"
+
+
+def configure_templates(app):
+    production = is_production()
+    app.config["TEMPLATES_AUTO_RELOAD"] = not production
+    app.jinja_env.auto_reload = not production
+    if not production:
+        return
+    directory = os.environ.get("JINJA_BYTECODE_CACHE_DIR", "/tmp/hyla-jinja-cache")
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        pass
+    if os.path.isdir(directory):
+        app.jinja_env.bytecode_cache = _BytecodeCache(directory)
+
+
+def render_fragments(template_name, items, name, key, csrf_field="", **context):
+    """Render `template_name` once per item, reusing cached HTML for unchanged items.
+
+    `key(item)` must change whenever the rendered output would. `csrf_input()`
+    renders a marker in the cached HTML that is swapped for `csrf_field`.
+    """
+    template = current_app.jinja_env.get_template(template_name)
+    cache = _get_fragment_cache()
+    context = {**context, "csrf_input": lambda: Markup(_CSRF_MARKER)}
+    parts = []
+    for item in items:
+        cache_key = (template_name, key(item))
+        html = cache.get(cache_key)
+        if html is None:
+            html = template.render(**context, **{name: item})
+            cache.set(cache_key, html)
+        parts.append(html)
+    return Markup("".join(parts).replace(_CSRF_MARKER, str(csrf_field)))
+
+
+def fragment_cache_stats():
+    return _get_fragment_cache().stats()
+
+
+def _get_fragment_cache():
+    global _fragment_cache
+    if _fragment_cache is None:
+        _fragment_cache = TTLCache(
+            maxsize=int(os.environ.get("ROW_FRAGMENT_CACHE_SIZE", "5000")),
+            ttl=int(os.environ.get("ROW_FRAGMENT_CACHE_TTL", "600")),
+        )
+    return _fragment_cache
@@ -1,7 +1,15 @@
+import hashlib
+import os
 from datetime import datetime
 
 from app.services.supabase import get_admin_client
 from app.services.audit import log_event
+from app.services.cache import TTLCache
+from app.services.utils import demo_assignable_roles, is_valid_uuid
+
+_profile_cache = None
+_roster_cache = None
+_bootstrap_checked = False
 
 
 def ensure_bootstrap_admin():
@@ -43,23 +51,76 @@ def ensure_bootstrap_admin():
     admin.table("users").insert(data).execute()
 
 
+def ensure_bootstrap_admin_for_login(email):
+    global _bootstrap_checked
+    bootstrap_email = _env("BOOTSTRAP_ADMIN_EMAIL")
+    if _bootstrap_checked or not bootstrap_email or email.lower() != bootstrap_email.lower():
+        return
+    try:
+        ensure_bootstrap_admin()
+    except Exception:
+        return
+    _bootstrap_checked = True
+
+
 def list_users(actor):
-    admin = get_admin_client()
-    query = admin.table("users").select("*")
-    if actor.get("role") == "JEFE":
-        query = query.eq("team_id", actor.get("team_id"))
-    result = query.execute()
-    return [_normalize_user(row) for row in result.data]
+    return list(get_team_roster(actor)["users"])
+
+
+def get_team_roster(actor):
+    key = actor.get("team_id") if actor.get("role") == "JEFE" else "*"
+    cache = _get_roster_cache()
+    roster = cache.get(key)
+    if roster is None:
+        admin = get_admin_client()
+        query = admin.table("users").select("*")
+        if actor.get("role") == "JEFE":
+            query = query.eq("team_id", actor.get("team_id"))
+        result = query.execute()
+        roster = _build_roster([_normalize_user(row) for row in result.data])
+        cache.set(key, roster)
+    return roster
+
+
+def invalidate_team_rosters():
+    _get_roster_cache().clear()
+
+
+def roster_cache_stats():
+    return _get_roster_cache().stats()
 
 
 def get_user_profile(uid):
+    cache = _get_profile_cache()
+    cached = cache.get(uid)
+    if cached is not None:
+        return dict(cached)
     admin = get_admin_client()
     result = admin.table("users").select("*").eq("id", uid).limit(1).execute()
+    if not result.data:
+        return None
+    profile = _normalize_user(result.data[0])
+    cache.set(uid, profile)
+    return dict(profile)
+
+
+def get_user_profile_by_email(email):
+    admin = get_admin_client()
+    result = admin.table("users").select("*").eq("email", email).limit(1).execute()
     if not result.data:
         return None
     return _normalize_user(result.data[0])
 
 
+def invalidate_user_profile(uid):
+    _get_profile_cache().pop(uid)
+    invalidate_team_rosters()
+
+
+def profile_cache_stats():
+    return _get_profile_cache().stats()
+
+
 def ensure_profile_for_auth_user(user):
     admin = get_admin_client()
     if not user or not user.id:
@@ -80,6 +141,7 @@ def ensure_profile_for_auth_user(user):
     }
     try:
         admin.table("users").insert(data).execute()
+        invalidate_user_profile(user.id)
         return _normalize_user(data)
     except Exception:
         return None
@@ -101,7 +163,7 @@ def create_user(
         role = role if role in {"VENDEDOR", "RECLUTA"} else "RECLUTA"
         team_id = actor.get("team_id")
         manager_user_id = actor.get("uid")
-    if manager_user_id and not _valid_uuid(manager_user_id):
+    if manager_user_id and not is_valid_uuid(manager_user_id):
         manager_user_id = None
     existing_user = _get_user_by_email(admin, email)
     if existing_user:
@@ -139,6 +201,7 @@ def create_user(
         "updated_at": now,
     }
     admin.table("users").insert(data).execute()
+    invalidate_user_profile(uid)
     log_event(
         actor=actor,
         action="CREATE",
@@ -151,14 +214,19 @@ def create_user(
     return uid
 
 
-def update_user(actor, uid, updates):
+def update_user(actor, uid, updates, before=None):
     admin = get_admin_client()
-    if "manager_user_id" in updates and updates["manager_user_id"] and not _valid_uuid(updates["manager_user_id"]):
+    if "manager_user_id" in updates and updates["manager_user_id"] and not is_valid_uuid(updates["manager_user_id"]):
         updates["manager_user_id"] = None
-    before = get_user_profile(uid)
+    if before is None:
+        before = get_user_profile(uid)
     updates["updated_at"] = datetime.utcnow().isoformat()
-    admin.table("users").update(updates).eq("id", uid).execute()
-    after = get_user_profile(uid)
+    result = admin.table("users").update(updates).eq("id", uid).execute()
+    invalidate_user_profile(uid)
+    if not result.data:
+        raise ValueError("user_not_found")
+    after = _normalize_user(result.data[0])
+    _get_profile_cache().set(uid, after)
     action = "USER_STATUS_CHANGE" if "status" in updates else "UPDATE"
     log_event(
         actor=actor,
@@ -173,10 +241,61 @@ def update_user(actor, uid, updates):
 
 
 def _profile_exists(admin, uid):
+    if _get_profile_cache().get(uid) is not None:
+        return True
     result = admin.table("users").select("id").eq("id", uid).limit(1).execute()
     return bool(result.data)
 
 
+def _get_profile_cache():
+    global _profile_cache
+    if _profile_cache is None:
+        _profile_cache = TTLCache(
+            maxsize=int(os.environ.get("USER_PROFILE_CACHE_SIZE", "1024")),
+            ttl=int(os.environ.get("USER_PROFILE_CACHE_TTL", "30")),
+        )
+    return _profile_cache
+
+
+def _get_roster_cache():
+    global _roster_cache
+    if _roster_cache is None:
+        _roster_cache = TTLCache(
+            maxsize=int(os.environ.get("TEAM_ROSTER_CACHE_SIZE", "256")),
+            ttl=int(os.environ.get("TEAM_ROSTER_CACHE_TTL", "60")),
+        )
+    return _roster_cache
+
+
+def _build_roster(users):
+    by_team = {}
+    by_role = {}
+    for user in users:
+        by_team.setdefault(user.get("team_id"), []).append(user)
+        by_role.setdefault(role_name(user), []).append(user)
+    return {
+        "users": users,
+        "by_team": by_team,
+        "by_role": by_role,
+        "managers": by_role.get("JEFE", []),
+        "demo_assignable": [u for u in users if role_name(u) in demo_assignable_roles()],
+        "names": {u.get("uid"): u.get("name") for u in users},
+        "version": _roster_version(users),
+    }
+
+
+def _roster_version(users):
+    fingerprint = sorted(
+        (str(u.get("uid")), u.get("name") or "", role_name(u), u.get("status") or "", u.get("team_id") or "")
+        for u in users
+    )
+    return hashlib.sha1(repr(fingerprint).encode("utf-8")).hexdigest()[:12]
+
+
+def role_name(user):
+    return (user.get("role") or "").strip().upper()
+
+
 def _get_user_by_email(admin, email):
     try:
         return admin.auth.admin.get_user_by_email(email).user
@@ -190,17 +309,5 @@ def _normalize_user(row):
     return row
 
 
-def _valid_uuid(value):
-    import uuid
-
-    try:
-        uuid.UUID(str(value))
-        return True
-    except ValueError:
-        return False
-
-
 def _env(key, default=None):
-    import os
-
     return os.environ.get(key, default)
@@ -1,5 +1,9 @@
+import base64
+import os
 import re
 import urllib.parse
+import uuid
+from datetime import datetime
 
 
 def is_valid_whatsapp(number):
@@ -30,6 +34,42 @@ def generate_maps_link(address_line, city, region, country):
     return f"https://www.google.com/maps/search/?api=1&query={encoded}"
 
 
+def is_valid_uuid(value):
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+def background_mode(setting):
+    """Return `sync` or `async` for the work configured by the `setting` env var.
+
+    Vercel freezes or recycles the function after each response, so work left
+    in background threads (or spooled to /tmp) can be lost; default to `sync`.
+    """
+    default = "sync" if os.environ.get("VERCEL") else "async"
+    return os.environ.get(setting, default).lower()
+
+
+def encode_cursor(timestamp, row_id):
+    raw = f"{timestamp}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        uuid.UUID(row_id)
+    except ValueError:
+        return None
+    return timestamp, row_id
+
+
 def allowed_image_extension(filename):
     return filename.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))
 
@@ -0,0 +1,244 @@
+(function () {
+  var toggle = document.getElementById("sidebarToggle");
+  var backdrop = document.getElementById("sidebarBackdrop");
+
+  if (!toggle) {
+    attachInlineForms();
+    attachBulkSelect();
+    attachTypeahead();
+    attachLiveUpdates();
+    return;
+  }
+
+  function closeSidebar() {
+    document.body.classList.remove("sidebar-open");
+  }
+
+  function openSidebar() {
+    document.body.classList.add("sidebar-open");
+  }
+
+  toggle.addEventListener("click", function () {
+    if (document.body.classList.contains("sidebar-open")) {
+      closeSidebar();
+    } else {
+      openSidebar();
+    }
+  });
+
+  if (backdrop) {
+    backdrop.addEventListener("click", closeSidebar);
+  }
+
+  attachInlineForms();
+  attachBulkSelect();
+  attachTypeahead();
+  attachLiveUpdates();
+
+  function attachLiveUpdates() {
+    var target = document.querySelector("[data-live-events]");
+    if (!target || !window.EventSource) {
+      return;
+    }
+    var cardRules = {
+      activos: function (status) { return !!status && status !== "NO_INTERESADO"; },
+      demo_agendada: function (status) { return status === "DEMO_AGENDADA"; },
+      venta_cerrada: function (status) { return status === "VENTA_CERRADA"; }
+    };
+    var source = new EventSource(target.dataset.liveEvents);
+
+    source.addEventListener("lead", function (event) {
+      var data = JSON.parse(event.data);
+      var lead = data.lead || {};
+      patchCards(data.previous_status, data.visible ? lead.status : null);
+      patchRow(data, lead);
+    });
+
+    function patchCards(previous, current) {
+      document.querySelectorAll("[data-card]").forEach(function (card) {
+        var rule = cardRules[card.dataset.card];
+        if (!rule) {
+          return;
+        }
+        var delta = (rule(current) ? 1 : 0) - (rule(previous) ? 1 : 0);
+        if (delta) {
+          card.textContent = Math.max(0, (parseInt(card.textContent, 10) || 0) + delta);
+        }
+      });
+    }
+
+    function patchRow(data, lead) {
+      if (!document.getElementById("bulkForm")) {
+        return;
+      }
+      var row = document.querySelector('tr[data-lead-id="' + lead.id + '"]');
+      if (!row) {
+        if (data.action === "created" && data.visible) {
+          showLiveBanner();
+        }
+        return;
+      }
+      if (!data.visible) {
+        row.classList.add("row-removed");
+        return;
+      }
+      row.querySelectorAll(".inline-form select").forEach(function (select) {
+        if (select.disabled || select === document.activeElement) {
+          return;
+        }
+        var value = select.name === "status" ? lead.status : lead.demo_user_id;
+        select.value = value || "";
+        select.dataset.current = select.value;
+      });
+      row.classList.add("row-saved");
+      setTimeout(function () { row.classList.remove("row-saved"); }, 1200);
+    }
+
+    function showLiveBanner() {
+      var banner = document.querySelector(".live-banner");
+      if (!banner) {
+        banner = document.createElement("div");
+        banner.className = "banner live-banner";
+        banner.dataset.count = "0";
+        target.parentNode.insertBefore(banner, target);
+        banner.addEventListener("click", function () { window.location.reload(); });
+      }
+      var count = parseInt(banner.dataset.count, 10) + 1;
+      banner.dataset.count = String(count);
+      banner.textContent = count === 1
+        ? "Hay 1 demo nueva. Haz clic para actualizar."
+        : "Hay " + count + " demos nuevas. Haz clic para actualizar.";
+    }
+  }
+
+  function attachTypeahead() {
+    var input = document.querySelector("input[data-typeahead]");
+    if (!input) {
+      return;
+    }
+    var box = input.parentNode.querySelector(".search-suggestions");
+    var timer = null;
+    var lastQuery = "";
+
+    input.addEventListener("input", function () {
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var query = input.value.trim();
+        if (query.length < 3) {
+          box.hidden = true;
+          return;
+        }
+        lastQuery = query;
+        fetch(input.dataset.typeahead + "?q=" + encodeURIComponent(query), {
+          credentials: "same-origin",
+          headers: { "X-Requested-With": "XMLHttpRequest" }
+        })
+          .then(function (res) { return res.json(); })
+          .then(function (data) {
+            if (query !== lastQuery) {
+              return;
+            }
+            box.innerHTML = "";
+            (data.results || []).forEach(function (item) {
+              var link = document.createElement("a");
+              link.href = item.url;
+              link.textContent = item.name + " · " + (item.whatsapp_number || "") + (item.city ? " · " + item.city : "");
+              box.appendChild(link);
+            });
+            box.hidden = !box.children.length;
+          })
+          .catch(function () {
+            box.hidden = true;
+          });
+      }, 200);
+    });
+
+    input.addEventListener("blur", function () {
+      setTimeout(function () { box.hidden = true; }, 200);
+    });
+  }
+
+  function attachBulkSelect() {
+    var selectAll = document.getElementById("bulkSelectAll");
+    if (!selectAll) {
+      return;
+    }
+    selectAll.addEventListener("change", function () {
+      document.querySelectorAll('input[name="lead_ids"]').forEach(function (checkbox) {
+        checkbox.checked = selectAll.checked;
+      });
+    });
+  }
+
+  function attachInlineForms() {
+    var selects = document.querySelectorAll(".inline-form select");
+    selects.forEach(function (select) {
+      select.dataset.current = select.value;
+      select.addEventListener("change", function (event) {
+        var form = event.target.form;
+        if (!form) {
+          return;
+        }
+        var formData = new FormData(form);
+        select.disabled = true;
+        fetch(form.action, {
+          method: "POST",
+          body: formData,
+          credentials: "same-origin",
+          headers: {
+            "X-Requested-With": "XMLHttpRequest",
+            "Accept": "application/json"
+          }
+        })
+          .then(function (res) {
+            var type = res.headers.get("Content-Type") || "";
+            if (type.indexOf("application/json") === -1) {
+              throw new Error("No se pudo guardar. Recarga la página e inténtalo de nuevo.");
+            }
+            return res.json().then(function (data) {
+              if (!res.ok || data.error) {
+                throw new Error(data.error || "No se pudo guardar.");
+              }
+              return data;
+            });
+          })
+          .then(function (data) {
+            var lead = data.lead || {};
+            var value = select.name === "status" ? lead.status : lead.demo_user_id;
+            select.value = value || "";
+            select.dataset.current = select.value;
+            var row = select.closest("tr");
+            if (row) {
+              row.classList.add("row-saved");
+              setTimeout(function () { row.classList.remove("row-saved"); }, 1200);
+            }
+          })
+          .catch(function (error) {
+            select.value = select.dataset.current;
+            showFlash(error.message, "error");
+          })
+          .then(function () {
+            select.disabled = false;
+          });
+      });
+    });
+  }
+
+  function showFlash(message, category) {
+    var container = document.querySelector("main.container");
+    if (!container) {
+      return;
+    }
+    var group = container.querySelector(".flash-group");
+    if (!group) {
+      group = document.createElement("div");
+      group.className = "flash-group";
+      container.insertBefore(group, container.firstChild);
+    }
+    var flash = document.createElement("div");
+    flash.className = "flash " + category;
+    flash.textContent = message;
+    group.appendChild(flash);
+    setTimeout(function () { flash.remove(); }, 6000);
+  }
+})();
@@ -0,0 +1,59 @@
+"""Mide el arranque en frío de la app tal como lo ve Vercel.
+
+Cada corrida levanta un intérprete nuevo, importa `api/index.py` (que crea la
+app) y atiende un primer request a `/login`. Uso:
+
+    python bench/cold_start.py --runs 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from api.index import app
+imported = time.perf_counter()
+response = app.test_client().get("/login")
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+    "total_ms": (served - start) * 1000,
+    "status": response.status_code,
+    "modules": len(sys.modules),
+}))
+"""
+
+
+def run_once():
+    started = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(started.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    for key in ("import_ms", "first_request_ms", "total_ms"):
+        values = [sample[key] for sample in samples]
+        print(f"{key:>18}: mediana {statistics.median(values):8.1f}  máx {max(values):8.1f}")
+    print(f"{'status':>18}: {samples[-1]['status']}  módulos cargados: {samples[-1]['modules']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""Datos sintéticos y deterministas para el cliente falso de Supabase."""
+
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from app.services.dashboard import _counters_from_leads, _parse_dt
+from app.services.utils import lead_statuses
+
+from bench.fake_supabase import auth_user
+
+DATASET_SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+FIRST_NAMES = ["Camila", "Valentina", "Javiera", "Sofía", "Matías", "Benjamín", "Vicente", "Martín", "Diego", "Ignacio"]
+LAST_NAMES = ["González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez", "Sepúlveda"]
+CITIES = ["Santiago", "Valparaíso", "Concepción", "La Serena", "Temuco", "Antofagasta", "Rancagua", "Talca"]
+TEAMS = ["norte", "centro", "sur", "default"]
+
+
+def seed(client, leads=1_000, images_per_lead=2, audit_per_lead=3, now=None, rng_seed=7):
+    """Carga usuarios, demos, imágenes y auditoría; devuelve los usuarios por rol."""
+    rng = random.Random(rng_seed)
+    now = now or datetime.utcnow()
+    client.computed_columns["leads"] = _lead_search_text
+    client.rpcs["lead_dashboard_counters"] = _dashboard_counters_rpc
+    client.rpcs["lead_scope_version"] = _scope_version_rpc
+
+    users = _seed_users(client, rng, now)
+    owners = [user for user in users if user["role"] in {"VENDEDOR", "RECLUTA", "JEFE"}]
+    statuses = lead_statuses()
+    lead_rows = []
+    image_rows = []
+    audit_rows = []
+    for index in range(leads):
+        owner = rng.choice(owners)
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 120))
+        lead = client._store(
+            "leads",
+            {
+                "id": _uuid(rng),
+                "owner_user_id": owner["id"],
+                "demo_user_id": owner["id"] if rng.random() < 0.5 else None,
+                "team_id": owner["team_id"],
+                "first_name": rng.choice(FIRST_NAMES),
+                "last_name": rng.choice(LAST_NAMES),
+                "occupation": "",
+                "whatsapp_number": f"569{rng.randint(10_000_000, 99_999_999)}",
+                "address_line": f"Calle {index} #{rng.randint(1, 999)}",
+                "city": rng.choice(CITIES),
+                "region": "",
+                "country": "Chile",
+                "status": rng.choice(statuses),
+                "notes": "",
+                "created_at": _timestamp(created_at),
+                "updated_at": _timestamp(created_at + timedelta(minutes=rng.randint(0, 600))),
+            },
+        )
+        lead_rows.append(lead)
+        for image_index in range(images_per_lead):
+            image_id = _uuid(rng)
+            base = f"leads/{lead['id']}/{image_id}"
+            image_rows.append(
+                {
+                    "id": image_id,
+                    "lead_id": lead["id"],
+                    "storage_path": f"{base}.webp",
+                    "medium_path": f"{base}-medium.webp",
+                    "thumb_path": f"{base}-thumb.webp",
+                    "uploaded_by": owner["id"],
+                    "uploaded_at": _timestamp(created_at + timedelta(minutes=image_index)),
+                }
+            )
+        for audit_index in range(audit_per_lead):
+            audit_rows.append(
+                {
+                    "id": _uuid(rng),
+                    "timestamp": _timestamp(created_at + timedelta(minutes=audit_index)),
+                    "actor_user_id": owner["id"],
+                    "actor_name": owner["name"],
+                    "action": "UPDATE" if audit_index else "CREATE",
+                    "entity_type": "lead",
+                    "entity_id": lead["id"],
+                    "team_id": owner["team_id"],
+                    "before": None,
+                    "after": {"status": lead["status"]},
+                }
+            )
+    client.tables["leads"] = lead_rows
+    client.tables["lead_images"] = image_rows
+    client.tables["audit_logs"] = audit_rows
+    return {role: [user for user in users if user["role"] == role] for role in {user["role"] for user in users}}
+
+
+def _seed_users(client, rng, now):
+    users = []
+    admin = _user(rng, "Admin Bench", "ADMIN", "default", now)
+    users.append(admin)
+    for team in TEAMS:
+        boss = _user(rng, f"Jefe {team}", "JEFE", team, now)
+        users.append(boss)
+        for index in range(6):
+            role = "VENDEDOR" if index < 4 else "RECLUTA"
+            users.append(_user(rng, f"{role.title()} {team} {index}", role, team, now, boss["id"]))
+    client.tables["users"] = users
+    for user in users:
+        client.auth_users[user["id"]] = auth_user(user["id"], user["email"], name=user["name"])
+    return users
+
+
+def _user(rng, name, role, team, now, manager=None):
+    uid = _uuid(rng)
+    return {
+        "id": uid,
+        "name": name,
+        "email": f"{uid[:8]}@bench.hyla",
+        "role": role,
+        "status": "ACTIVO",
+        "city": "Santiago",
+        "team_id": team,
+        "manager_user_id": manager,
+        "created_at": _timestamp(now),
+        "updated_at": _timestamp(now),
+    }
+
+
+def _dashboard_counters_rpc(client, params):
+    rows = _scoped_rows(client, params)
+    now = _parse_dt(params.get("p_now")).replace(tzinfo=None)
+    return _counters_from_leads(rows, now)
+
+
+def _scope_version_rpc(client, params):
+    rows = _scoped_rows(client, params)
+    return {"total": len(rows), "latest": max((row.get("updated_at") or "" for row in rows), default=None)}
+
+
+def _scoped_rows(client, params):
+    rows = client.tables.get("leads", [])
+    role = params.get("p_role")
+    if role == "JEFE":
+        return [row for row in rows if row.get("team_id") == params.get("p_team_id")]
+    if role in {"VENDEDOR", "RECLUTA"}:
+        return [row for row in rows if row.get("owner_user_id") == params.get("p_uid")]
+    return rows
+
+
+def _lead_search_text(row):
+    fields = ("first_name", "last_name", "whatsapp_number", "city", "notes")
+    return {"search_text": " ".join(row.get(field) or "" for field in fields).lower()}
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _timestamp(value):
+    return value.isoformat() + "+00:00"
@@ -0,0 +1,403 @@
+"""Cliente de Supabase en memoria para medir la app sin un proyecto real.
+
+Implementa el subconjunto que usan los servicios: el query builder de
+PostgREST (`table().select().eq().order().limit().execute()`, `insert`,
+`update`, `delete`, `or_`, `ilike`, `in_`, `is_`, `not_`), `rpc`, Auth
+(`get_user`, `sign_in_with_password`, `admin.create_user`,
+`admin.get_user_by_email`) y Storage (`upload`, `remove`, `create_signed_url(s)`).
+
+Cada llamada espera `latency` segundos y queda registrada en `calls` y en las
+métricas por request de `app.services.metrics`, igual que una llamada real.
+"""
+
+import copy
+import re
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+from app.services.metrics import record_backend_call
+
+_CONDITION = re.compile(r'^(?P<column>[\w]+)\.(?P<op>eq|neq|gt|gte|lt|lte|ilike|is)\.(?P<value>.*)$')
+
+
+class FakeSupabase:
+    def __init__(self, latency=0.0, name="admin"):
+        self.latency = latency
+        self.name = name
+        self.tables = {}
+        self.rpcs = {}
+        self.computed_columns = {}
+        self.calls = []
+        self.auth_users = {}
+        self.tokens = {}
+        self.objects = {}
+        self.lock = threading.RLock()
+        self.auth = _FakeAuth(self)
+        self.storage = _FakeStorage(self)
+
+    def table(self, name):
+        self.tables.setdefault(name, [])
+        return _FakeQuery(self, name)
+
+    def rpc(self, name, params=None):
+        return _FakeRpc(self, name, params or {})
+
+    def reset_calls(self):
+        with self.lock:
+            self.calls = []
+
+    def backend_seconds(self):
+        """Tiempo de pared dentro del cliente; las llamadas en paralelo se solapan."""
+        total = 0.0
+        end = None
+        for call in sorted(self.calls, key=lambda call: call["started"]):
+            finished = call["started"] + call["duration"]
+            if end is None or call["started"] >= end:
+                total += call["duration"]
+                end = finished
+            elif finished > end:
+                total += finished - end
+                end = finished
+        return total
+
+    def _call(self, operation, fn):
+        started = time.perf_counter()
+        if self.latency:
+            time.sleep(self.latency)
+        try:
+            with self.lock:
+                return fn()
+        finally:
+            duration = time.perf_counter() - started
+            with self.lock:
+                self.calls.append({"operation": operation, "started": started, "duration": duration})
+            record_backend_call(self.name, operation, duration)
+
+    def _store(self, table, row):
+        row = dict(row)
+        row.setdefault("id", str(uuid.uuid4()))
+        compute = self.computed_columns.get(table)
+        if compute:
+            row.update(compute(row))
+        return row
+
+
+class _FakeQuery:
+    def __init__(self, client, table):
+        self._client = client
+        self._table = table
+        self._action = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload = None
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._negate = False
+
+    @property
+    def not_(self):
+        self._negate = True
+        return self
+
+    def select(self, columns="*", count=None):
+        self._columns = columns
+        self._count = count
+        return self
+
+    def insert(self, payload, **kwargs):
+        self._action = "insert"
+        self._payload = payload
+        return self
+
+    def update(self, payload, **kwargs):
+        self._action = "update"
+        self._payload = payload
+        return self
+
+    def delete(self, **kwargs):
+        self._action = "delete"
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def ilike(self, column, pattern):
+        return self._filter(column, "ilike", pattern)
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def in_(self, column, values):
+        values = {str(value) for value in values}
+        self._filters.append(lambda row: str(row.get(column)) in values)
+        return self
+
+    def or_(self, expression):
+        branches = [_parse_condition(part) for part in _split_top_level(expression)]
+        self._filters.append(lambda row: any(branch(row) for branch in branches))
+        return self
+
+    def order(self, column, desc=False):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size):
+        self._limit = size
+        return self
+
+    def execute(self):
+        return self._client._call(f"{self._table}.{self._action}", self._run)
+
+    def _filter(self, column, op, value):
+        check = _condition(column, op, value)
+        if self._negate:
+            self._negate = False
+            self._filters.append(lambda row: not check(row))
+        else:
+            self._filters.append(check)
+        return self
+
+    def _run(self):
+        rows = self._client.tables[self._table]
+        if self._action == "insert":
+            payload = self._payload if isinstance(self._payload, list) else [self._payload]
+            inserted = [self._client._store(self._table, row) for row in payload]
+            rows.extend(inserted)
+            return _result(copy.deepcopy(inserted))
+        matched = [row for row in rows if all(check(row) for check in self._filters)]
+        if self._action == "update":
+            for row in matched:
+                row.update(self._payload)
+                row.update(self._client._store(self._table, row))
+            return _result(copy.deepcopy(matched))
+        if self._action == "delete":
+            keep = [row for row in rows if row not in matched]
+            rows[:] = keep
+            return _result(copy.deepcopy(matched))
+        for column, desc in reversed(self._order):
+            matched.sort(key=lambda row: _sort_key(row.get(column)), reverse=desc)
+        total = len(matched) if self._count else None
+        if self._limit is not None:
+            matched = matched[: self._limit]
+        return _result([_project(row, self._columns) for row in matched], count=total)
+
+
+class _FakeRpc:
+    def __init__(self, client, name, params):
+        self._client = client
+        self._name = name
+        self._params = params
+
+    def execute(self):
+        return self._client._call(f"rpc.{self._name}", self._run)
+
+    def _run(self):
+        handler = self._client.rpcs.get(self._name)
+        if handler is None:
+            raise RuntimeError(f"PGRST202: function {self._name} not found")
+        return _result(handler(self._client, self._params))
+
+
+class _FakeAuth:
+    def __init__(self, client):
+        self._client = client
+        self.admin = _FakeAuthAdmin(client)
+
+    def get_user(self, token):
+        def run():
+            uid = self._client.tokens.get(token)
+            user = self._client.auth_users.get(uid)
+            return SimpleNamespace(user=user)
+
+        return self._client._call("auth.user", run)
+
+    def sign_in_with_password(self, credentials):
+        def run():
+            for user in self._client.auth_users.values():
+                if user.email == credentials.get("email") and user.password == credentials.get("password"):
+                    token = f"token-{uuid.uuid4()}"
+                    self._client.tokens[token] = user.id
+                    session = SimpleNamespace(access_token=token, refresh_token=f"refresh-{user.id}")
+                    return SimpleNamespace(session=session, user=user)
+            raise RuntimeError("Invalid login credentials")
+
+        return self._client._call("auth.token", run)
+
+
+class _FakeAuthAdmin:
+    def __init__(self, client):
+        self._client = client
+
+    def create_user(self, attributes):
+        def run():
+            user = _auth_user(str(uuid.uuid4()), attributes.get("email"), attributes.get("password"))
+            self._client.auth_users[user.id] = user
+            return SimpleNamespace(user=user)
+
+        return self._client._call("auth.admin.users", run)
+
+    def get_user_by_email(self, email):
+        def run():
+            for user in self._client.auth_users.values():
+                if user.email == email:
+                    return SimpleNamespace(user=user)
+            return SimpleNamespace(user=None)
+
+        return self._client._call("auth.admin.users", run)
+
+
+class _FakeStorage:
+    def __init__(self, client):
+        self._client = client
+
+    def from_(self, bucket):
+        return _FakeBucket(self._client, bucket)
+
+
+class _FakeBucket:
+    def __init__(self, client, bucket):
+        self._client = client
+        self._bucket = bucket
+
+    def upload(self, path, content, file_options=None):
+        def run():
+            self._client.objects[(self._bucket, path)] = bytes(content)
+            return SimpleNamespace(path=path)
+
+        return self._client._call("storage.upload", run)
+
+    def remove(self, paths):
+        def run():
+            for path in paths:
+                self._client.objects.pop((self._bucket, path), None)
+            return [{"name": path} for path in paths]
+
+        return self._client._call("storage.remove", run)
+
+    def create_signed_url(self, path, expires_in):
+        return self._client._call("storage.sign", lambda: {"signedURL": self._signed(path, expires_in)})
+
+    def create_signed_urls(self, paths, expires_in):
+        return self._client._call(
+            "storage.sign",
+            lambda: [{"path": path, "signedURL": self._signed(path, expires_in), "error": None} for path in paths],
+        )
+
+    def _signed(self, path, expires_in):
+        return f"https://fake.supabase.co/storage/v1/object/sign/{self._bucket}/{path}?token=x&expires={expires_in}"
+
+
+def auth_user(uid, email, password="secret", name=None):
+    return _auth_user(uid, email, password, name)
+
+
+def _auth_user(uid, email, password, name=None):
+    return SimpleNamespace(
+        id=uid,
+        email=email,
+        password=password,
+        user_metadata={"name": name or email},
+        app_metadata={},
+    )
+
+
+def _result(data, count=None):
+    return SimpleNamespace(data=data, count=count)
+
+
+def _project(row, columns):
+    if columns.strip() == "*":
+        return dict(row)
+    return {column.strip(): row.get(column.strip()) for column in columns.split(",")}
+
+
+def _sort_key(value):
+    return (value is None, "" if value is None else str(value))
+
+
+def _condition(column, op, value):
+    if op == "ilike":
+        pattern = re.compile(
+            "^" + ".*".join(re.escape(part) for part in str(value).replace("%", "*").split("*")) + "$",
+            re.IGNORECASE | re.DOTALL,
+        )
+        return lambda row: row.get(column) is not None and bool(pattern.match(str(row.get(column))))
+    if op == "is":
+        return lambda row: row.get(column) is None if value in {None, "null"} else row.get(column) == value
+    text = None if value is None else str(value)
+
+    def check(row):
+        current = row.get(column)
+        if current is None or text is None:
+            return op == "eq" and current is None and text is None
+        current = str(current)
+        if op == "eq":
+            return current == text
+        if op == "neq":
+            return current != text
+        if op == "gt":
+            return current > text
+        if op == "gte":
+            return current >= text
+        if op == "lt":
+            return current < text
+        return current <= text
+
+    return check
+
+
+def _parse_condition(expression):
+    expression = expression.strip()
+    if expression.startswith("and(") and expression.endswith(")"):
+        parts = [_parse_condition(part) for part in _split_top_level(expression[4:-1])]
+        return lambda row: all(part(row) for part in parts)
+    if expression.startswith("or(") and expression.endswith(")"):
+        parts = [_parse_condition(part) for part in _split_top_level(expression[3:-1])]
+        return lambda row: any(part(row) for part in parts)
+    match = _CONDITION.match(expression)
+    if not match:
+        raise ValueError(f"Filtro no soportado por el cliente falso: {expression}")
+    value = match.group("value")
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+    return _condition(match.group("column"), match.group("op"), value)
+
+
+def _split_top_level(expression):
+    parts = []
+    depth = 0
+    quoted = False
+    current = []
+    for ch in expression:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    if current:
+        parts.append("".join(current))
+    return parts
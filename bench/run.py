@@ -0,0 +1,218 @@
+"""Benchmarks offline de las rutas principales contra el cliente falso de Supabase.
+
+Mide cada escenario con cachés calientes (tras un request de calentamiento):
+idas y vueltas a Supabase por request, tiempo total y tiempo propio de la app
+(total menos el tiempo dentro del cliente falso). Termina con código 1 si un
+escenario supera su presupuesto de idas y vueltas o, con `--compare`, si el
+tiempo propio empeora más que `--tolerance` respecto de una corrida guardada.
+
+    python bench/run.py --sizes 1k,10k --iterations 5 --save bench_output.json
+    python bench/run.py --sizes 1k --compare bench_output.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import jwt  # noqa: E402
+
+import app.services.supabase as supabase_module  # noqa: E402
+from app import create_app  # noqa: E402
+from bench.datasets import DATASET_SIZES, seed  # noqa: E402
+from bench.fake_supabase import FakeSupabase  # noqa: E402
+
+BENCH_ENV = {
+    "SUPABASE_URL": "https://bench.supabase.co",
+    "SUPABASE_ANON_KEY": "bench-anon",
+    "SUPABASE_JWT_SECRET": "bench-jwt-secret-0123456789abcdef",
+    "AUDIT_MODE": "sync",
+    "IMAGE_PROCESSING": "sync",
+    "LEAD_METRICS_ROLLUP": "0",
+    "BOOTSTRAP_ADMIN_EMAIL": "",
+}
+
+# Idas y vueltas a Supabase permitidas por request con cachés calientes.
+ROUND_TRIP_BUDGETS = {
+    "dashboard": 2,
+    # Versión del alcance + contadores (en paralelo); el 304 solo la versión.
+    "dashboard_metrics": 2,
+    "dashboard_metrics_304": 1,
+    "leads_list": 1,
+    "leads_list_304": 1,
+    "leads_list_search": 1,
+    "leads_list_jefe": 1,
+    "lead_detail": 3,
+    "lead_edit_get": 1,
+    "lead_edit_post": 3,
+    "lead_quick_status": 3,
+    "leads_bulk_status": 3,
+}
+
+
+# Operaciones que un escenario no debe ejecutar (el 304 no recalcula contadores).
+FORBIDDEN_OPERATIONS = {
+    "dashboard_metrics_304": {"rpc.lead_dashboard_counters", "rpc.lead_metrics_rollup_counters"},
+}
+
+
+def build_scenarios(users, lead_ids):
+    lead_id = lead_ids[0]
+    statuses = ["CONTACTADO", "DEMO_AGENDADA"]
+    counter = {"value": 0}
+
+    def next_status():
+        counter["value"] += 1
+        return statuses[counter["value"] % 2]
+
+    def edit_form():
+        return {
+            "first_name": "Camila",
+            "last_name": "Rojas",
+            "whatsapp_number": "56912345678",
+            "city": "Santiago",
+            "country": "Chile",
+            "status": next_status(),
+        }
+
+    admin = users["ADMIN"][0]
+    jefe = users["JEFE"][0]
+    return [
+        ("dashboard", admin, "GET", "/", None),
+        ("dashboard_metrics", admin, "GET", "/dashboard/metrics", None),
+        ("dashboard_metrics_304", admin, "GET", "/dashboard/metrics", "revalidate"),
+        ("leads_list", admin, "GET", "/leads", None),
+        ("leads_list_304", admin, "GET", "/leads", "revalidate"),
+        ("leads_list_search", admin, "GET", "/leads?q=gonz", None),
+        ("leads_list_jefe", jefe, "GET", "/leads", None),
+        ("lead_detail", admin, "GET", f"/leads/{lead_id}", None),
+        ("lead_edit_get", admin, "GET", f"/leads/{lead_id}/editar", None),
+        ("lead_edit_post", admin, "POST", f"/leads/{lead_id}/editar", edit_form),
+        ("lead_quick_status", admin, "POST", f"/leads/{lead_id}/estado", lambda: {"status": next_status()}),
+        (
+            "leads_bulk_status",
+            admin,
+            "POST",
+            "/leads/acciones",
+            lambda: {"lead_ids": lead_ids[:50], "action": "status", "bulk_status": next_status()},
+        ),
+    ]
+
+
+def run_size(label, size, iterations, latency):
+    fake = FakeSupabase(latency=latency)
+    now = datetime.utcnow()
+    users = seed(fake, leads=size, now=now)
+    supabase_module._public_client = fake
+    supabase_module._admin_client = fake
+
+    app = create_app()
+    os.environ.update(BENCH_ENV)
+    app.config["WTF_CSRF_ENABLED"] = False
+    lead_ids = [lead["id"] for lead in sorted(fake.tables["leads"], key=lambda row: row["created_at"], reverse=True)]
+
+    results = {}
+    for name, actor, method, path, form in build_scenarios(users, lead_ids):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["access_token"] = _access_token(actor, now)
+        warmup = _request(client, method, path, form)
+        headers = {"If-None-Match": warmup.headers.get("ETag", "")} if form == "revalidate" else {}
+        round_trips = []
+        totals = []
+        own = []
+        for _ in range(iterations):
+            fake.reset_calls()
+            started = time.perf_counter()
+            response = _request(client, method, path, form, headers)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise SystemExit(f"{name}: respuesta {response.status_code}")
+            round_trips.append(len(fake.calls))
+            totals.append(elapsed * 1000)
+            own.append(max(0.0, elapsed - fake.backend_seconds()) * 1000)
+        results[name] = {
+            "round_trips": max(round_trips),
+            "operations": sorted(call["operation"] for call in fake.calls),
+            "total_ms": statistics.median(totals),
+            "app_ms": statistics.median(own),
+        }
+    return results
+
+
+def check(results, baseline, tolerance):
+    failures = []
+    for label, scenarios in results.items():
+        for name, data in scenarios.items():
+            budget = ROUND_TRIP_BUDGETS.get(name)
+            if budget is not None and data["round_trips"] > budget:
+                failures.append(f"[{label}] {name}: {data['round_trips']} idas y vueltas (máximo {budget})")
+            forbidden = FORBIDDEN_OPERATIONS.get(name, set()) & set(data["operations"])
+            if forbidden:
+                failures.append(f"[{label}] {name}: ejecutó {', '.join(sorted(forbidden))}")
+            previous = (baseline or {}).get(label, {}).get(name)
+            if previous and data["app_ms"] > previous["app_ms"] * (1 + tolerance) + 1:
+                failures.append(
+                    f"[{label}] {name}: {data['app_ms']:.1f} ms de app (antes {previous['app_ms']:.1f} ms)"
+                )
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1k,10k", help="Tamaños de datos: 1k, 10k, 100k")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latencia simulada por llamada")
+    parser.add_argument("--save", help="Guarda los resultados en este JSON")
+    parser.add_argument("--compare", help="JSON de una corrida anterior para detectar regresiones de tiempo")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = {}
+    for label in [label.strip() for label in args.sizes.split(",") if label.strip()]:
+        results[label] = run_size(label, DATASET_SIZES[label], args.iterations, args.latency_ms / 1000)
+        print(f"\n{label} demos")
+        print(f"{'escenario':<22} {'idas':>5} {'total ms':>10} {'app ms':>10}")
+        for name, data in results[label].items():
+            print(f"{name:<22} {data['round_trips']:>5} {data['total_ms']:>10.1f} {data['app_ms']:>10.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+    failures = check(results, baseline, args.tolerance)
+    if failures:
+        print("\nRegresiones:")
+        for failure in failures:
+            print(f"- {failure}")
+        sys.exit(1)
+
+
+def _request(client, method, path, form, headers=None):
+    if method == "POST":
+        return client.post(path, data=form())
+    return client.get(path, headers=headers)
+
+
+def _access_token(user, now):
+    claims = {
+        "sub": user["id"],
+        "email": user["email"],
+        "aud": "authenticated",
+        "role": "authenticated",
+        "exp": now + timedelta(hours=12),
+    }
+    return jwt.encode(claims, BENCH_ENV["SUPABASE_JWT_SECRET"], algorithm="HS256")
+
+
+if __name__ == "__main__":
+    main()